@@ -0,0 +1,281 @@
+import os
+import json
+import hashlib
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from subtitles import CUE_CACHE_DIR, CUE_CACHE_MAX_BYTES, evict_cue_cache
+
+# Largest constant offset between the two tracks that is looked for, in seconds
+MAX_OFFSET = 120.0
+OFFSET_RESOLUTION = 0.1
+# Offset votes within this many bins of each other count together
+OFFSET_TOLERANCE_BINS = 2
+# Only cue pairs of about the same duration vote for an offset
+DURATION_TOLERANCE = 0.3
+# Speed ratios tried for tracks timed for another frame rate (e.g. 25 vs 23.976 fps)
+FRAME_RATE_RATIOS = (1.0, 25 / 23.976, 23.976 / 25, 25 / 24, 24 / 25, 24 / 23.976, 23.976 / 24)
+# Alignment passes; each re-matches the cues against the correction fitted by the previous one
+ALIGNMENT_PASSES = 3
+# After the first correction, cues this far from their prediction are not considered
+MATCH_WINDOW = 10.0
+# Pairs overlapping less than this (intersection over union) are not matched
+MIN_OVERLAP = 0.2
+# Matched pairs per knot of the piecewise-linear correction
+KNOT_SPACING = 25
+# Below this share of matched left cues the tracks are considered unrelated
+MIN_MATCHED_FRACTION = 0.3
+ALIGNMENT_VERSION = 2
+
+
+def estimate_offset(left, right, ratio=1.0, max_offset=MAX_OFFSET, resolution=OFFSET_RESOLUTION):
+    """
+    Offset such that right time = ratio * left time + offset lines up the most cues.
+    This is the peak of the cross-correlation of the two start-time impulse trains,
+    computed only over cue pairs of similar duration less than max_offset apart.
+
+    Returns:
+        tuple: (offset in seconds, number of agreeing cue pairs)
+    """
+    votes = Counter()
+    for start, end in zip(left.starts, left.ends):
+        start, duration = start * ratio, (end - start) * ratio
+        for j in range(bisect_left(right.starts, start - max_offset), bisect_right(right.starts, start + max_offset)):
+            if abs(right.ends[j] - right.starts[j] - duration) <= DURATION_TOLERANCE:
+                votes[round((right.starts[j] - start) / resolution)] += 1
+    if not votes:
+        return 0.0, 0
+    smoothed = {delta: sum(votes.get(delta + k, 0) for k in range(-OFFSET_TOLERANCE_BINS, OFFSET_TOLERANCE_BINS + 1))
+                for delta in votes}
+    best = max(smoothed, key=lambda delta: (smoothed[delta], -abs(delta)))
+    return best * resolution, smoothed[best]
+
+
+def initial_time_map(left, right):
+    """
+    Linear map (frame rate ratio and offset) under which the most cues line up.
+    """
+    best = None
+    for ratio in FRAME_RATE_RATIOS:
+        offset, score = estimate_offset(left, right, ratio)
+        if best is None or score > best[0]:
+            best = (score, ratio, offset)
+    _, ratio, offset = best
+    # right = ratio * t + offset, as knots of (left time, right time - left time)
+    first, last = left.starts[0], max(left.starts[-1], left.starts[0] + 1)
+    return TimeMap([first, last], [(ratio - 1) * first + offset, (ratio - 1) * last + offset])
+
+def overlap(start_a, end_a, start_b, end_b):
+    """
+    Intersection over union of two time intervals.
+    """
+    intersection = min(end_a, end_b) - max(start_a, start_b)
+    if intersection <= 0:
+        return 0.0
+    return intersection / (max(end_a, end_b) - min(start_a, start_b))
+
+
+class TimeMap:
+    """
+    Piecewise-linear map from left-track time to right-track time, stored as
+    knots (left time, offset). The first and last segments are extended beyond
+    the knots, so a frame rate difference keeps applying to the outermost cues.
+    """
+
+    def __init__(self, times, offsets):
+        self.times = array('d', times)
+        self.offsets = array('d', offsets)
+
+    def offset(self, time_sec):
+        if len(self.times) == 1:
+            return self.offsets[0]
+        index = min(max(bisect_right(self.times, time_sec), 1), len(self.times) - 1)
+        t0, t1 = self.times[index - 1], self.times[index]
+        o0, o1 = self.offsets[index - 1], self.offsets[index]
+        if t1 == t0:
+            return o1
+        return o0 + (o1 - o0) * (time_sec - t0) / (t1 - t0)
+
+    def __call__(self, time_sec):
+        return time_sec + self.offset(time_sec)
+
+
+def fit_time_map(left, right, pairs, spacing=KNOT_SPACING):
+    """
+    Knots at the medians of consecutive groups of matched pairs; medians keep a
+    few wrong matches from bending the correction.
+    """
+    points = sorted(((left.starts[i] + left.ends[i]) / 2,
+                     (right.starts[j] + right.ends[j] - left.starts[i] - left.ends[i]) / 2) for i, j in pairs)
+    times, offsets = [], []
+    for group_start in range(0, len(points), spacing):
+        group = points[group_start:group_start + spacing]
+        if len(group) < spacing // 2 and times:
+            break  # Too few for a knot of its own; the last knot is extended instead
+        times.append(group[len(group) // 2][0])
+        offsets.append(sorted(offset for _, offset in group)[len(group) // 2])
+    return TimeMap(times, offsets)
+
+
+def match_cues(left, right, time_map, window=MATCH_WINDOW, min_overlap=MIN_OVERLAP):
+    """
+    Best monotonic one-to-one matching of left to right cues by dynamic programming.
+    Each left cue is only compared with the right cues near its mapped time, and the
+    best chain ending before a right index is kept in a max Fenwick tree, so the
+    whole alignment is O(candidates * log n).
+
+    Returns:
+        list: Matched (left index, right index) pairs in order
+    """
+    count = len(right)
+    tree = [(0.0, -1)] * (count + 1)  # (score, node) of the best chain ending at right index < position
+    nodes = []  # (left index, right index, previous node)
+
+    for i in range(len(left)):
+        start, end = time_map(left.starts[i]), time_map(left.ends[i])
+        row = []
+        for j in range(bisect_left(right.starts, start - window), bisect_right(right.starts, end + window)):
+            similarity = overlap(start, end, right.starts[j], right.ends[j])
+            if similarity < min_overlap:
+                continue
+            # Best chain over right indexes < j, built from earlier left cues only
+            best, previous, position = 0.0, -1, j
+            while position > 0:
+                if tree[position][0] > best:
+                    best, previous = tree[position]
+                position -= position & -position
+            row.append((best + similarity, j, previous))
+        for score, j, previous in row:
+            nodes.append((i, j, previous))
+            position = j + 1
+            while position <= count:
+                if score > tree[position][0]:
+                    tree[position] = (score, len(nodes) - 1)
+                position += position & -position
+
+    best, node = 0.0, -1
+    position = count
+    while position > 0:
+        if tree[position][0] > best:
+            best, node = tree[position]
+        position -= position & -position
+    pairs = []
+    while node >= 0:
+        i, j, node = nodes[node]
+        pairs.append((i, j))
+    pairs.reverse()
+    return pairs
+
+
+class Alignment:
+    """
+    Cue-to-cue mapping from the left to the right subtitles plus the time correction.
+    """
+
+    def __init__(self, mapping, time_map, matched):
+        self.mapping = array('i', mapping)
+        self.time_map = time_map
+        self.matched = matched
+
+    def right_index(self, left_index):
+        """
+        Right cue corresponding to a left cue, or -1.
+        """
+        return self.mapping[left_index] if 0 <= left_index < len(self.mapping) else -1
+
+    def to_dict(self):
+        return {
+            'version': ALIGNMENT_VERSION,
+            'mapping': list(self.mapping),
+            'times': list(self.time_map.times),
+            'offsets': list(self.time_map.offsets),
+            'matched': self.matched,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['mapping'], TimeMap(data['times'], data['offsets']), data['matched'])
+
+
+def align_subtitles(left, right):
+    """
+    Align two CueIndex tracks of the same video.
+
+    Returns:
+        Alignment: or None if too few cues match for the tracks to belong together
+    """
+    if not len(left) or not len(right):
+        return None
+    time_map = initial_time_map(left, right)
+    pairs = []
+    # The first pass matches against the linear estimate, later ones against the drift it reveals
+    for _ in range(ALIGNMENT_PASSES):
+        pairs = match_cues(left, right, time_map)
+        if not pairs:
+            return None
+        time_map = fit_time_map(left, right, pairs)
+
+    if len(pairs) < MIN_MATCHED_FRACTION * len(left):
+        logging.info(f"Subtitles not aligned: only {len(pairs)} of {len(left)} cues match")
+        return None
+
+    mapping = [-1] * len(left)
+    for i, j in pairs:
+        mapping[i] = j
+    # Cues that were split or merged in the other track map to the right cue they overlap most
+    for i in range(len(left)):
+        if mapping[i] >= 0:
+            continue
+        start, end = time_map(left.starts[i]), time_map(left.ends[i])
+        candidates = range(bisect_left(right.starts, start - MATCH_WINDOW), bisect_right(right.starts, end))
+        best = max(candidates, key=lambda j: overlap(start, end, right.starts[j], right.ends[j]), default=-1)
+        if best >= 0 and overlap(start, end, right.starts[best], right.ends[best]) > 0:
+            mapping[i] = best
+    logging.info(f"Aligned subtitles: {len(pairs)} of {len(left)} cues matched, "
+                 f"offset {time_map.offsets[0]:+.2f} s to {time_map.offsets[-1]:+.2f} s")
+    return Alignment(mapping, time_map, len(pairs))
+
+
+def alignment_cache_path(left_path, right_path, cache_dir=CUE_CACHE_DIR):
+    """
+    Cache file for an SRT pair; any change of either file gives a new key.
+    """
+    parts = []
+    for file_path in (left_path, right_path):
+        st = os.stat(file_path)
+        parts.append(f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}")
+    return os.path.join(cache_dir, hashlib.sha1("\n".join(parts).encode('utf-8')).hexdigest() + ".align")
+
+
+def align_subtitles_cached(left_path, right_path, left, right, cache_dir=CUE_CACHE_DIR,
+                           max_bytes=CUE_CACHE_MAX_BYTES):
+    """
+    Like align_subtitles, but reuses the result computed for this exact pair of files.
+    Results share the cue cache's directory and size limit; hits refresh their mtime.
+    """
+    try:
+        cache_file = alignment_cache_path(left_path, right_path, cache_dir)
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.utime(cache_file)
+            if data is None:
+                return None  # Known not to align
+            if data.get('version') == ALIGNMENT_VERSION and len(data['mapping']) == len(left):
+                return Alignment.from_dict(data)
+    except Exception as e:
+        logging.error(f"Error reading alignment cache for {left_path} and {right_path}: {e}")
+        cache_file = None
+
+    alignment = align_subtitles(left, right)
+    if cache_file:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(alignment.to_dict() if alignment else None, f)
+            evict_cue_cache(cache_dir, max_bytes)
+        except Exception as e:
+            logging.error(f"Error writing alignment cache for {left_path} and {right_path}: {e}")
+    return alignment
@@ -0,0 +1,294 @@
+import sys
+import json
+import time
+import types
+import random
+import logging
+import platform
+import argparse
+import importlib
+from types import SimpleNamespace
+
+from subtitles import SubtitlePane, format_time, parse_srt, parse_time
+
+SIZES = (1000, 10000, 100000)
+QUICK_SIZES = (1000, 10000)
+# Variants of generated subtitle files: (name, options for generate_srt)
+VARIANTS = (
+    ("plain", {}),
+    ("overlapping", {'overlapping': True}),
+    ("multiline", {'multiline': True}),
+    ("crlf", {'crlf': True}),
+)
+# A result slower than the baseline by more than this factor is a regression
+REGRESSION_THRESHOLD = 1.25
+# Player dependencies replaced by empty modules when missing (e.g. on headless CI)
+PLAYER_STUB_MODULES = ("vlc", "screeninfo")
+WORDS = ("the", "a", "you", "know", "what", "I", "mean", "never", "again", "tomorrow",
+         "weather", "station", "doesn't", "matter", "listen", "café", "über", "okay")
+
+
+def generate_srt(count, overlapping=False, multiline=False, crlf=False, seed=0):
+    """
+    Synthetic SRT content with `count` cues of 1-4 s separated by short gaps.
+    Overlapping files start every fifth cue before the previous one ended;
+    multi-line files give every cue two or three lines.
+    """
+    rng = random.Random(seed)
+    blocks = []
+    start = 1.0
+    for number in range(1, count + 1):
+        end = start + rng.uniform(1.0, 4.0)
+        lines = rng.randint(2, 3) if multiline else 1
+        text = "\n".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))) for _ in range(lines))
+        blocks.append(f"{number}\n{format_time(start)} --> {format_time(end)}\n{text}\n")
+        if overlapping and number % 5 == 0:
+            start = end - rng.uniform(0.5, 1.0)
+        else:
+            start = end + rng.uniform(0.1, 1.5)
+    content = "\n".join(blocks)
+    return content.replace("\n", "\r\n") if crlf else content
+
+
+class FakeText:
+    """
+    Stands in for the Tk Text widget of a subtitle pane; only counts the edits.
+    """
+
+    def __init__(self):
+        self.edits = 0
+
+    def config(self, **options):
+        pass
+
+    def tag_configure(self, *args, **options):
+        pass
+
+    def insert(self, index, text):
+        self.edits += 1
+
+    def delete(self, start, end=None):
+        self.edits += 1
+
+    def tag_add(self, *args):
+        pass
+
+    def tag_remove(self, *args):
+        pass
+
+    def see(self, index):
+        pass
+
+
+class MockPlayer:
+    """
+    Player clock for the benchmarks: time only moves when the benchmark moves it.
+    """
+
+    def __init__(self):
+        self.time_ms = 0
+
+    def get_time(self):
+        return self.time_ms
+
+    def set_time(self, time_ms):
+        self.time_ms = time_ms
+
+
+def measure(function, repeat, number=1):
+    """
+    Run function `number` times per round for `repeat` rounds.
+    Returns (best, mean) seconds per round.
+    """
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        rounds.append(time.perf_counter() - started)
+    return min(rounds), sum(rounds) / len(rounds)
+
+
+def result(name, params, operations, best, mean):
+    return {
+        'name': name,
+        'params': params,
+        'operations': operations,
+        'best_ms': round(best * 1000, 3),
+        'mean_ms': round(mean * 1000, 3),
+        'per_op_us': round(best * 1e6 / max(1, operations), 3),
+    }
+
+
+def bench_parse_srt(contents, repeat):
+    results = []
+    for (size, variant), content in contents.items():
+        best, mean = measure(lambda: parse_srt(content), repeat)
+        results.append(result("parse_srt", {'cues': size, 'variant': variant}, size, best, mean))
+    return results
+
+
+def bench_parse_time(repeat, count=100000):
+    stamps = [format_time(random.Random(number).uniform(0, 36000)) for number in range(count)]
+
+    def run():
+        for stamp in stamps:
+            parse_time(stamp)
+
+    best, mean = measure(run, repeat)
+    return [result("parse_time", {'timestamps': count}, count, best, mean)]
+
+
+def stub_missing_modules(names=PLAYER_STUB_MODULES):
+    """
+    Register empty stand-ins for the named modules that are not installed.
+    The benchmarks only call VideoPlayer methods that never touch them.
+    """
+    stubbed = []
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            sys.modules[name] = types.ModuleType(name)
+            stubbed.append(name)
+    if stubbed:
+        logging.info(f"Stubbed missing player dependencies: {', '.join(stubbed)}")
+    return stubbed
+
+
+def load_player_class():
+    """
+    VideoPlayer's methods are timed on a fake instance. Importing video1 needs the
+    player's own dependencies; python-vlc and screeninfo are stubbed if missing,
+    and None is returned if anything else (e.g. tkinter) is.
+    """
+    stub_missing_modules()
+    try:
+        from video1 import VideoPlayer
+    except ImportError as e:
+        logging.warning(f"Skipping VideoPlayer benchmarks, video1 could not be imported: {e}")
+        return None
+    # Keep the player's log output out of the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    return VideoPlayer
+
+
+def fake_player(subtitles):
+    return SimpleNamespace(
+        player=MockPlayer(),
+        left_subtitles=subtitles,
+        left_subtitle_index=0,
+        right_subtitle_index=0,
+        on_seek=lambda time_ms: None,
+    )
+
+
+def bench_cue_lookup(player_class, indexes, repeat, tick_ms=100, seeks=10000):
+    """
+    update_subtitle_section over a whole file played at tick_ms steps, and for random seeks.
+    """
+    results = []
+    for (size, variant), subtitles in indexes.items():
+        end = subtitles.max_ends[-1] if len(subtitles) else 0
+        ticks = [step * tick_ms / 1000 for step in range(int(end * 1000 / tick_ms) + 1)]
+        jumps = [random.Random(number).uniform(0, end) for number in range(seeks)]
+        for mode, times in (("playback", ticks), ("seek", jumps)):
+            def run():
+                player = fake_player(subtitles)
+                pane = SubtitlePane(FakeText())
+                for current_time in times:
+                    player_class.update_subtitle_section(player, current_time, subtitles, pane, 'left')
+
+            best, mean = measure(run, repeat)
+            results.append(result("update_subtitle_section",
+                                  {'cues': size, 'variant': variant, 'mode': mode}, len(times), best, mean))
+    return results
+
+
+def bench_jump_to_next_subtitle(player_class, indexes, repeat):
+    """
+    jump_to_next_subtitle from the start to the end of a file; the mocked clock
+    plays on for a second after every jump.
+    """
+    results = []
+    for (size, variant), subtitles in indexes.items():
+        def run():
+            player = fake_player(subtitles)
+            for _ in range(size):
+                player_class.jump_to_next_subtitle(player)
+                player.player.time_ms += 1000
+
+        best, mean = measure(run, repeat)
+        results.append(result("jump_to_next_subtitle", {'cues': size, 'variant': variant}, size, best, mean))
+    return results
+
+
+def run_benchmarks(sizes, repeat):
+    contents = {(size, variant): generate_srt(size, **options)
+                for size in sizes for variant, options in VARIANTS}
+    indexes = {key: parse_srt(content) for key, content in contents.items()}
+
+    results = bench_parse_srt(contents, repeat)
+    results += bench_parse_time(repeat)
+    player_class = load_player_class()
+    if player_class:
+        results += bench_cue_lookup(player_class, indexes, repeat)
+        results += bench_jump_to_next_subtitle(player_class, indexes, repeat)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def result_key(entry):
+    return entry['name'], json.dumps(entry['params'], sort_keys=True)
+
+
+def find_regressions(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Entries whose best time exceeds the baseline's by more than `threshold` times.
+    """
+    previous = {result_key(entry): entry for entry in baseline['results']}
+    regressions = []
+    for entry in report['results']:
+        old = previous.get(result_key(entry))
+        if old and old['best_ms'] > 0 and entry['best_ms'] > old['best_ms'] * threshold:
+            regressions.append({'name': entry['name'], 'params': entry['params'],
+                                'baseline_ms': old['best_ms'], 'best_ms': entry['best_ms']})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark subtitle parsing and playback sync hot paths.")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Rounds per benchmark; the best one counts")
+    parser.add_argument("--quick", action="store_true", help=f"Only {', '.join(map(str, QUICK_SIZES))} cues")
+    parser.add_argument("--compare", help="Baseline JSON report; exit with 1 if anything got slower")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Slowdown factor counted as a regression (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    report = run_benchmarks(QUICK_SIZES if args.quick else SIZES, args.repeat)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = find_regressions(report, json.load(f), args.threshold)
+        report['regressions'] = regressions
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    for regression in regressions:
+        logging.error(f"Regression in {regression['name']} {regression['params']}: "
+                      f"{regression['baseline_ms']} ms -> {regression['best_ms']} ms")
+    sys.exit(1 if regressions else 0)
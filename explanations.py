@@ -0,0 +1,594 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import deque
+from itertools import count
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+SYSTEM_PROMPT = "Act as a helpful expert with ten years of experience that provides the best possible answers to my questions and requests. Your domain of expertise is teaching {language}."
+WORD_PROMPT = "Briefly explain the following word in simple terms: \"{text}\""
+TEXT_PROMPT = "Briefly explain the following text in simple terms: \"{text}\""
+
+BATCH_PROMPT = ("Briefly explain each of the following words or phrases in simple terms. "
+                "Answer with a JSON object that maps every item, exactly as written, to its explanation.\n{items}")
+
+# Changing any prompt changes this, so answers to old prompts are not reused
+PROMPT_VERSION = hashlib.sha1("\n".join((SYSTEM_PROMPT, WORD_PROMPT, TEXT_PROMPT, BATCH_PROMPT))
+                              .encode('utf-8')).hexdigest()[:12]
+
+# Batch packing: rough token estimates against the model's output limit
+BATCH_MAX_OUTPUT_TOKENS = 12000
+BATCH_TOKENS_PER_ANSWER = 120
+BATCH_MAX_INPUT_TOKENS = 24000
+
+EXPLANATION_CACHE_FILE = "explanation_cache.db"
+EXPLANATION_CACHE_TTL = 90 * 24 * 3600  # seconds
+EXPLANATION_CACHE_MAX_ENTRIES = 50000
+
+# While streaming, partial answers are handed to the UI at most this often (~one frame)
+STREAM_UPDATE_SECONDS = 1 / 30
+
+# Optional word list, most frequent word first ("word" or "word count" per line).
+# Words ranked below COMMON_WORD_RANK are considered well known and never prefetched.
+WORD_FREQUENCY_FILE = "word_frequencies.txt"
+COMMON_WORD_RANK = 3000
+PREFETCH_MIN_INTERVAL = 2.0  # seconds between prefetch API calls
+PREFETCH_SESSION_BUDGET = 200  # API calls per session
+PREFETCH_MAX_PENDING = 50
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:['’-][^\W\d_]+)*")
+
+
+def build_messages(text, language="English"):
+    """
+    Chat messages asking the model to explain a word or a piece of subtitle text.
+    """
+    count_words = len(text.split())
+    if count_words < 3:
+        prompt = WORD_PROMPT.format(text=text)
+    else:
+        prompt = TEXT_PROMPT.format(text=text)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT.format(language=language)},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def normalize_text(text):
+    """
+    Cache key form of a selection: case, surrounding punctuation and spacing do not matter.
+    """
+    return " ".join(text.split()).strip(" .,;:!?\"'()[]-").casefold()
+
+
+class ExplanationCache:
+    """
+    On-disk (SQLite) cache of AI explanations keyed by the normalized text, language,
+    model and prompt version. Entries expire after a TTL and the least recently used
+    ones are evicted beyond max_entries. Safe to use from several threads.
+    """
+
+    def __init__(self, path=EXPLANATION_CACHE_FILE, ttl=EXPLANATION_CACHE_TTL,
+                 max_entries=EXPLANATION_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS explanations ("
+            "key TEXT PRIMARY KEY, text TEXT, explanation TEXT, created REAL, last_used REAL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS explanations_last_used ON explanations (last_used)")
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(text, language, model):
+        raw = "\0".join((normalize_text(text), language, model, PROMPT_VERSION))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, text, language, model, count=True):
+        """
+        Return the cached explanation or None. Expired entries count as misses.
+        With count=False this only peeks: neither the statistics nor the entry's
+        recency are updated.
+        """
+        key = self.make_key(text, language, model)
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT explanation, created FROM explanations WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl:
+                if count:
+                    self.hits += 1
+                    self.connection.execute("UPDATE explanations SET last_used = ? WHERE key = ?", (now, key))
+                    self.connection.commit()
+                return row[0]
+            if count:
+                self.misses += 1
+            return None
+
+    def put(self, text, language, model, explanation):
+        key = self.make_key(text, language, model)
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO explanations (key, text, explanation, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, normalize_text(text), explanation, now, now)
+            )
+            self.connection.commit()
+            self._evict(now)
+
+    def _evict(self, now):
+        self.connection.execute("DELETE FROM explanations WHERE created < ?", (now - self.ttl,))
+        self.connection.execute(
+            "DELETE FROM explanations WHERE key IN ("
+            "SELECT key FROM explanations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self.connection.commit()
+
+    def stats(self):
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class ExplanationWorker:
+    """
+    Runs AI explanation requests on a background thread so the player never blocks
+    on the network. One OpenAI client (and its connection pool) is reused for all
+    requests. A new interactive request supersedes older ones: queued ones are
+    dropped and the answer of one already in flight is discarded (or, when
+    streaming, its stream is closed).
+    """
+
+    def __init__(self, on_result, model=DEFAULT_MODEL, api_key=None, base_url=None,
+                 timeout=60, client=None, cache=None, stream=False):
+        """
+        Args:
+            on_result (callable): Called on the worker thread with a result dict
+                (id, text, language, explanation, error, partial). Marshal to Tk yourself.
+            model (str): Chat model name
+            api_key (str): Defaults to OPENAI_API_KEY
+            base_url (str): OpenAI-compatible endpoint, e.g. a local stub server.
+                Defaults to OPENAI_BASE_URL or the OpenAI API.
+            timeout (float): Per-request timeout in seconds
+            client: Pre-built client exposing chat.completions.create (mainly for tests)
+            cache (ExplanationCache): Answers are looked up here first and stored here
+            stream (bool): Stream the answer; on_result then also receives partial
+                results (partial=True) whose explanation is the text received so far
+        """
+        self.on_result = on_result
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.client = client
+        self.cache = cache
+        self.stream = stream
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.ids = count(1)
+        self.latest_id = 0
+        self.thread = None
+        self.stopped = False
+        self.busy = False
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="ExplanationWorker", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.pending.clear()
+            self.condition.notify_all()
+
+    def submit(self, text, language="English", looked_up=False):
+        """
+        Queue a request and return its id. Any older request that has not been
+        answered yet is considered stale. Pass looked_up=True when the caller has
+        just missed the cache with cached(), so the miss is not counted again.
+        """
+        with self.condition:
+            request_id = next(self.ids)
+            self.latest_id = request_id
+            self.pending.clear()  # Coalesce: only the newest selection matters
+            self.pending.append({'id': request_id, 'text': text, 'language': language, 'looked_up': looked_up})
+            self.condition.notify()
+        self.start()
+        return request_id
+
+    def cancel(self):
+        """
+        Drop queued requests and ignore the answer of the one in flight.
+        """
+        with self.condition:
+            self.latest_id = next(self.ids)
+            self.pending.clear()
+
+    def get_client(self):
+        """
+        Create the OpenAI client on first use and keep it for later requests.
+        """
+        if self.client is None:
+            from openai import OpenAI
+            self.client = OpenAI(api_key=self.api_key or os.getenv('OPENAI_API_KEY'),
+                                 base_url=self.base_url or os.getenv('OPENAI_BASE_URL'),
+                                 timeout=self.timeout)
+        return self.client
+
+    def cached(self, text, language="English", count=True):
+        """
+        Return the cached explanation, or None. Cheap enough for the Tk thread.
+        count=False peeks without touching the cache statistics.
+        """
+        return self.cache.get(text, language, self.model, count) if self.cache else None
+
+    def explain(self, text, language="English", count=True):
+        """
+        Synchronously ask the model unless the answer is cached; called on the worker thread.
+        """
+        explanation = self.cached(text, language, count)
+        if explanation is not None:
+            return explanation
+        completion = self.get_client().chat.completions.create(
+            model=self.model,
+            messages=build_messages(text, language)
+        )
+        explanation = completion.choices[0].message.content
+        if self.cache:
+            self.cache.put(text, language, self.model, explanation)
+        return explanation
+
+    def explain_many(self, phrases, language="English", on_progress=None):
+        """
+        Explain many phrases with as few model calls as possible. Cached phrases are
+        skipped; the rest are packed into batches whose estimated answers fit the
+        model's output limit and returned as a JSON object per batch. Every answer
+        goes into the cache used by the interactive path.
+
+        Args:
+            phrases (list): Words or phrases to explain
+            language (str): Language being taught
+            on_progress (callable): Called with (done, total) after each batch
+
+        Returns:
+            dict: phrase -> explanation (None if the model skipped it or its batch failed)
+        """
+        results = {}
+        todo = []
+        seen = set()
+        for phrase in phrases:
+            key = normalize_text(phrase)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            explanation = self.cached(phrase, language)
+            if explanation is None:
+                todo.append(phrase)
+            else:
+                results[phrase] = explanation
+
+        batches = pack_batches(todo)
+        for number, batch in enumerate(batches, 1):
+            try:
+                answers = self._explain_batch(batch, language)
+            except Exception as e:
+                # One failed call (timeout, rate limit) only loses its own batch
+                logging.error(f"Error explaining batch {number}/{len(batches)}: {e}")
+                results.update((phrase, None) for phrase in batch)
+                if on_progress:
+                    on_progress(number, len(batches))
+                continue
+            for phrase in batch:
+                explanation = answers.get(normalize_text(phrase))
+                results[phrase] = explanation
+                if explanation is None:
+                    logging.warning(f"No explanation returned for '{phrase}'")
+                elif self.cache:
+                    self.cache.put(phrase, language, self.model, explanation)
+            if on_progress:
+                on_progress(number, len(batches))
+        return results
+
+    def _explain_batch(self, batch, language):
+        """
+        One model call for a batch; returns normalized phrase -> explanation.
+        """
+        completion = self.get_client().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT.format(language=language)},
+                {"role": "user", "content": BATCH_PROMPT.format(items=json.dumps(batch, ensure_ascii=False))}
+            ],
+            response_format={"type": "json_object"}
+        )
+        try:
+            answers = json.loads(completion.choices[0].message.content)
+        except (TypeError, json.JSONDecodeError) as e:
+            logging.error(f"Error decoding batch explanation: {e}")
+            return {}
+        return {normalize_text(str(phrase)): str(explanation) for phrase, explanation in answers.items()}
+
+    def explain_streaming(self, request, on_progress):
+        """
+        Like explain, but streams the completion and calls on_progress(text_so_far)
+        at most once per STREAM_UPDATE_SECONDS. Returns None if the request went
+        stale, in which case the stream is abandoned.
+        """
+        explanation = self.cached(request['text'], request['language'], not request.get('looked_up'))
+        if explanation is not None:
+            return explanation
+        stream = self.get_client().chat.completions.create(
+            model=self.model,
+            messages=build_messages(request['text'], request['language']),
+            stream=True
+        )
+        parts = []
+        last_update = 0
+        try:
+            for chunk in stream:
+                if self.is_stale(request):
+                    return None
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                parts.append(chunk.choices[0].delta.content)
+                now = time.monotonic()
+                if now - last_update >= STREAM_UPDATE_SECONDS:
+                    on_progress("".join(parts))
+                    last_update = now
+        finally:
+            stream.close()
+        explanation = "".join(parts)
+        if self.cache:
+            self.cache.put(request['text'], request['language'], self.model, explanation)
+        return explanation
+
+    def is_stale(self, request):
+        return request['id'] < self.latest_id
+
+    def is_idle(self):
+        """
+        True when no interactive request is queued or running.
+        """
+        return not self.busy and not self.pending
+
+    def _next_request(self):
+        with self.condition:
+            while not self.pending and not self.stopped:
+                self.condition.wait()
+            if self.stopped:
+                return None
+            return self.pending.popleft()
+
+    def _run(self):
+        while True:
+            request = self._next_request()
+            if request is None:
+                return
+            if self.is_stale(request):
+                continue
+            self.busy = True
+            result = dict(request, explanation=None, error=None, partial=False)
+            try:
+                if self.stream:
+                    result['explanation'] = self.explain_streaming(
+                        request, lambda text: self._deliver(dict(result, explanation=text, partial=True)))
+                else:
+                    result['explanation'] = self.explain(request['text'], request['language'],
+                                                         not request['looked_up'])
+            except Exception as e:
+                logging.error(f"Error getting AI explanation: {e}")
+                result['error'] = str(e)
+            self.busy = False
+            if self.is_stale(request):
+                logging.debug(f"Discarding stale AI explanation for request {request['id']}")
+                continue
+            self._deliver(result)
+
+    def _deliver(self, result):
+        try:
+            self.on_result(result)
+        except Exception as e:
+            logging.error(f"Error delivering AI explanation: {e}")
+
+
+def pack_batches(phrases, max_output_tokens=BATCH_MAX_OUTPUT_TOKENS,
+                 tokens_per_answer=BATCH_TOKENS_PER_ANSWER, max_input_tokens=BATCH_MAX_INPUT_TOKENS):
+    """
+    Split phrases into batches whose estimated prompt and answer sizes fit one model call.
+    Token counts are estimated at four characters per token.
+    """
+    batches, batch, input_tokens = [], [], 0
+    for phrase in phrases:
+        phrase_tokens = len(phrase) // 4 + 2
+        if batch and (input_tokens + phrase_tokens > max_input_tokens
+                      or (len(batch) + 1) * tokens_per_answer > max_output_tokens):
+            batches.append(batch)
+            batch, input_tokens = [], 0
+        batch.append(phrase)
+        input_tokens += phrase_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def load_word_ranks(path=WORD_FREQUENCY_FILE):
+    """
+    Map each word of a frequency list to its rank (0 = most frequent).
+    Returns an empty dict if the list is missing.
+    """
+    ranks = {}
+    if not os.path.exists(path):
+        logging.info(f"No word frequency list at {path}; prefetching all longer words.")
+        return ranks
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            parts = line.split()
+            if parts:
+                ranks.setdefault(parts[0].casefold(), len(ranks))
+    return ranks
+
+
+def candidate_words(text, ranks, common_rank=COMMON_WORD_RANK):
+    """
+    Words of a cue worth explaining: not among the common_rank most frequent words.
+    Without a frequency list, words of five or more letters are used instead.
+    """
+    words = []
+    for match in WORD_PATTERN.finditer(text):
+        word = match.group().casefold()
+        if ranks:
+            if ranks.get(word, common_rank) >= common_rank:
+                words.append(word)
+        elif len(word) >= 5:
+            words.append(word)
+    return words
+
+
+class ExplanationPrefetcher:
+    """
+    Warms the explanation cache with uncommon words from the next few cues, so that
+    asking about them later is answered from the cache. Runs on its own thread,
+    only while the interactive worker is idle, no faster than min_interval per API
+    call and for at most `budget` API calls per session.
+    """
+
+    def __init__(self, worker, language="English", lookahead=5, word_list=WORD_FREQUENCY_FILE,
+                 min_interval=PREFETCH_MIN_INTERVAL, budget=PREFETCH_SESSION_BUDGET,
+                 max_pending=PREFETCH_MAX_PENDING):
+        """
+        Args:
+            worker (ExplanationWorker): Provides the client, model and cache
+            language (str): Language being taught
+            lookahead (int): Number of upcoming cues to scan
+            word_list (str): Frequency list used to tell rare words from common ones
+            min_interval (float): Minimum seconds between two API calls
+            budget (int): Maximum API calls in this session
+            max_pending (int): Queued words beyond this drop the oldest ones
+        """
+        self.worker = worker
+        self.language = language
+        self.lookahead = lookahead
+        self.word_list = word_list
+        self.min_interval = min_interval
+        self.budget = budget
+        self.ranks = None
+        self.pending = deque(maxlen=max_pending)
+        self.seen_words = set()
+        self.scanned = set()
+        self.subtitles = None
+        self.spent = 0
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+    def look_ahead(self, subtitles, index):
+        """
+        Queue candidate words from the cues after `index`. Cheap; called on the Tk
+        thread whenever the active cue changes.
+        """
+        if self.ranks is None or self.spent >= self.budget:
+            self.start()  # Loads the word list in the background first
+            return
+        if subtitles is not self.subtitles:
+            self.subtitles = subtitles
+            self.scanned.clear()
+        words = []
+        for i in range(index + 1, min(len(subtitles), index + 1 + self.lookahead)):
+            if i in self.scanned:
+                continue
+            self.scanned.add(i)
+            for word in candidate_words(subtitles.contents[i], self.ranks):
+                if word not in self.seen_words:
+                    self.seen_words.add(word)
+                    words.append(word)
+        if words:
+            with self.condition:
+                self.pending.extend(words)
+                self.condition.notify()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="ExplanationPrefetcher", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.pending.clear()
+            self.condition.notify_all()
+
+    def _next_word(self):
+        with self.condition:
+            while not self.pending and not self.stopped:
+                self.condition.wait()
+            return None if self.stopped else self.pending.popleft()
+
+    def _run(self):
+        self.ranks = load_word_ranks(self.word_list)
+        last_call = 0
+        while self.spent < self.budget:
+            word = self._next_word()
+            if word is None:
+                return
+            if self.worker.cached(word, self.language, count=False) is not None:
+                continue
+            # Interactive requests go first; keep to the rate limit
+            while not self.stopped and (not self.worker.is_idle() or time.monotonic() - last_call < self.min_interval):
+                time.sleep(0.2)
+            if self.stopped:
+                return
+            try:
+                self.spent += 1
+                last_call = time.monotonic()
+                self.worker.explain(word, self.language)
+                logging.debug(f"Prefetched explanation for '{word}' ({self.spent}/{self.budget})")
+            except Exception as e:
+                logging.error(f"Error prefetching explanation for '{word}': {e}")
+        logging.info(f"Explanation prefetch budget of {self.budget} calls used up.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Explain the uncommon words of SRT files in batches and cache the answers.")
+    parser.add_argument("srt_files", nargs="+", help="Subtitle files to collect words from")
+    parser.add_argument("--language", default="English", help="Language being taught")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Chat model name")
+    parser.add_argument("--word-list", default=WORD_FREQUENCY_FILE, help="Word frequency list, most frequent first")
+    args = parser.parse_args()
+
+    from subtitles import load_srt
+
+    ranks = load_word_ranks(args.word_list)
+    words = []
+    for srt_file in args.srt_files:
+        for content in load_srt(srt_file).contents:
+            words.extend(candidate_words(content, ranks))
+
+    cache = ExplanationCache()
+    worker = ExplanationWorker(None, model=args.model, cache=cache)
+    results = worker.explain_many(words, args.language,
+                                  on_progress=lambda done, total: logging.info(f"Batch {done}/{total} done."))
+    missing = sum(1 for explanation in results.values() if explanation is None)
+    logging.info(f"{len(results)} word(s) explained, {missing} missing. Cache: {cache.stats()}")
+    sys.exit(1 if missing else 0)
@@ -0,0 +1,78 @@
+import queue
+import atexit
+import logging
+import logging.handlers
+
+LOG_FILE = "video_player.log"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+# Hot-path messages (slider drags, key repeat) are logged at most this often per call site
+HOT_LOG_INTERVAL = 1.0
+
+
+def setup_logging(log_file=LOG_FILE, level=logging.DEBUG, max_bytes=LOG_MAX_BYTES,
+                  backup_count=LOG_BACKUP_COUNT):
+    """
+    Route the root logger through a queue. Logging calls only enqueue the record;
+    a background listener formats it and writes it to a size-rotated file and stderr,
+    so disk I/O never runs on the Tk thread.
+
+    Returns:
+        QueueListener: Already started; stopped automatically at exit
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                                        backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler,
+                                              respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most one record per call site every interval seconds.
+    Warnings and errors always pass. The next record that passes notes how many
+    were dropped in between.
+    """
+
+    def __init__(self, interval=HOT_LOG_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self.sites = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        site = (record.pathname, record.lineno)
+        last, suppressed = self.sites.get(site, (None, 0))
+        if last is not None and record.created - last < self.interval:
+            self.sites[site] = (last, suppressed + 1)
+            return False
+        self.sites[site] = (record.created, 0)
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar message(s) suppressed)"
+        return True
+
+
+def get_hot_logger(name, interval=HOT_LOG_INTERVAL):
+    """
+    Logger for messages from code that runs on every slider step or key repeat.
+    """
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, RateLimitFilter) for f in logger.filters):
+        logger.addFilter(RateLimitFilter(interval))
+    return logger
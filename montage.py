@@ -0,0 +1,182 @@
+import os
+import logging
+import tkinter as tk
+from collections import namedtuple
+
+import vlc
+
+from playback import set_video_output
+
+# Seconds of video kept before and after each line
+CLIP_PADDING = 0.75
+MONTAGE_MAX_CLIPS = 100
+# How often the montage checks whether the current clip has ended
+MONTAGE_POLL_MS = 40
+
+Clip = namedtuple('Clip', ['video_path', 'start', 'end', 'content'])
+
+
+def build_playlist(hits, padding=CLIP_PADDING, max_clips=MONTAGE_MAX_CLIPS):
+    """
+    Turn subtitle search hits into padded clips, best hits first. Hits without a
+    video on disk are skipped; overlapping clips of the same video are merged.
+
+    Args:
+        hits (list): SearchHit tuples from SubtitleIndex.search
+        padding (float): Seconds added before and after every line
+
+    Returns:
+        list: Clip tuples
+    """
+    clips = []
+    for hit in hits:
+        if not hit.video_path or not os.path.exists(hit.video_path):
+            continue
+        start, end = max(0, hit.start - padding), hit.end + padding
+        for number, clip in enumerate(clips):
+            if clip.video_path == hit.video_path and start <= clip.end and end >= clip.start:
+                clips[number] = Clip(clip.video_path, min(start, clip.start), max(end, clip.end), clip.content)
+                break
+        else:
+            clips.append(Clip(hit.video_path, start, end, " ".join(hit.content.split())))
+            if len(clips) >= max_clips:
+                break
+    return clips
+
+
+class ClipMontage:
+    """
+    Plays clips back to back in their own window. Two VLC media players take turns:
+    while one plays the current clip, the other has already opened the next one
+    (muted and paused at its start) behind it, so switching clips is just a swap.
+    """
+
+    def __init__(self, master, instance, clips, title="Playphrase"):
+        """
+        Args:
+            master: Tk root
+            instance: The player's vlc.Instance
+            clips (list): Clip tuples to play
+            title (str): Window title
+        """
+        self.instance = instance
+        self.clips = clips
+        self.index = -1
+        self.active = 0
+        self.preloaded = None
+        self.preload_paused = False
+        self.poll_handle = None
+        self.closed = False
+
+        self.window = tk.Toplevel(master)
+        self.window.title(title)
+        self.window.geometry("800x520")
+        stage = tk.Frame(self.window, bg="black")
+        stage.pack(fill=tk.BOTH, expand=1)
+        # Both players render into frames stacked on top of each other; the visible one is lifted
+        self.frames = [tk.Frame(stage, bg="black") for _ in range(2)]
+        for frame in self.frames:
+            frame.place(relx=0, rely=0, relwidth=1, relheight=1)
+
+        self.caption = tk.Label(self.window, font=("Arial", 14), wraplength=760)
+        self.caption.pack(pady=5)
+        buttons = tk.Frame(self.window)
+        buttons.pack(pady=5)
+        tk.Button(buttons, text="Previous", command=lambda: self.play(self.index - 1)).grid(row=0, column=0, padx=5)
+        tk.Button(buttons, text="Replay", command=lambda: self.play(self.index)).grid(row=0, column=1, padx=5)
+        tk.Button(buttons, text="Next", command=lambda: self.play(self.index + 1)).grid(row=0, column=2, padx=5)
+        tk.Button(buttons, text="Close", command=self.close).grid(row=0, column=3, padx=5)
+        self.window.bind('<Left>', lambda event: self.play(self.index - 1))
+        self.window.bind('<Right>', lambda event: self.play(self.index + 1))
+        self.window.bind('<Escape>', lambda event: self.close())
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.players = [self.instance.media_player_new() for _ in range(2)]
+        self.window.update_idletasks()  # The frames need native windows before VLC can use them
+        for player, frame in zip(self.players, self.frames):
+            set_video_output(player, frame.winfo_id())
+        self.play(0)
+
+    def media_for(self, clip):
+        media = self.instance.media_new(clip.video_path)
+        media.add_option(f":start-time={clip.start:.3f}")
+        media.add_option(f":stop-time={clip.end:.3f}")
+        return media
+
+    def play(self, index):
+        """
+        Show clip `index`, swapping to the preloaded player when it holds that clip.
+        """
+        if self.closed or not 0 <= index < len(self.clips):
+            return
+        self._cancel_poll()
+        previous = self.players[self.active]
+        if index == self.preloaded:
+            self.active = 1 - self.active
+            player = self.players[self.active]
+            player.audio_set_mute(False)
+            player.set_pause(0)
+            previous.stop()
+        else:
+            player = previous
+            player.set_media(self.media_for(self.clips[index]))
+            player.audio_set_mute(False)
+            player.play()
+        self.frames[self.active].lift()
+        self.index = index
+
+        clip = self.clips[index]
+        self.caption.config(text=f"{index + 1}/{len(self.clips)}  {os.path.basename(clip.video_path)}\n{clip.content}")
+        logging.info(f"Playing clip {index + 1}/{len(self.clips)} from {clip.video_path} at {clip.start:.1f} seconds")
+        self._preload(index + 1)
+        self._poll()
+
+    def _preload(self, index):
+        idle = self.players[1 - self.active]
+        self.preloaded = None
+        if index >= len(self.clips):
+            idle.stop()
+            return
+        idle.set_media(self.media_for(self.clips[index]))
+        idle.audio_set_mute(True)
+        idle.play()
+        self.preloaded = index
+        self.preload_paused = False
+
+    def _poll(self):
+        self.poll_handle = None
+        if self.closed:
+            return
+        # The preloading player is paused as soon as it actually plays
+        if self.preloaded is not None and not self.preload_paused:
+            idle = self.players[1 - self.active]
+            idle.audio_set_mute(True)
+            if idle.is_playing():
+                idle.set_pause(1)
+                self.preload_paused = True
+
+        player = self.players[self.active]
+        clip = self.clips[self.index]
+        if player.get_state() in (vlc.State.Ended, vlc.State.Error) or player.get_time() / 1000 >= clip.end:
+            if self.index + 1 < len(self.clips):
+                self.play(self.index + 1)
+            else:
+                player.pause()
+                self.caption.config(text=f"{len(self.clips)} clip(s) played.\n{clip.content}")
+            return
+        self.poll_handle = self.window.after(MONTAGE_POLL_MS, self._poll)
+
+    def _cancel_poll(self):
+        if self.poll_handle is not None:
+            self.window.after_cancel(self.poll_handle)
+            self.poll_handle = None
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._cancel_poll()
+        for player in self.players:
+            player.stop()
+            player.release()
+        self.window.destroy()
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+STATE_DB_FILE = "video_player_data.db"
+# Older versions kept every video in one JSON file; it is imported once
+LEGACY_DATA_FILE = "video_player_data.json"
+
+
+class PlayerStateStore:
+    """
+    Per-video player state (subtitle files, position, tracks, volume) in SQLite.
+    Each update touches only that video's row and is committed in its own
+    transaction on a background writer thread, so the Tk thread never waits on disk.
+    Updates queued for the same video before the writer gets to them are merged.
+    Records are read one video at a time when it is opened.
+    """
+
+    def __init__(self, path=STATE_DB_FILE, legacy_file=LEGACY_DATA_FILE):
+        """
+        Args:
+            path (str): SQLite database file
+            legacy_file (str): JSON file of older versions, imported if the database is new
+        """
+        self.path = path
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.connection = self._connect()
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS videos (path TEXT PRIMARY KEY, data TEXT, updated REAL)"
+        )
+        self.connection.commit()
+        if legacy_file:
+            self._import_legacy(legacy_file)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _import_legacy(self, legacy_file):
+        if not os.path.exists(legacy_file):
+            return
+        if self.connection.execute("SELECT 1 FROM videos LIMIT 1").fetchone():
+            return
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            now = time.time()
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO videos (path, data, updated) VALUES (?, ?, ?)",
+                    [(path, json.dumps(data), now) for path, data in records.items()]
+                )
+            logging.info(f"Imported {len(records)} video record(s) from {legacy_file}")
+        except Exception as e:
+            logging.error(f"Error importing persisted data from {legacy_file}: {e}")
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="state-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Write everything still queued, then stop the writer.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self._flush()
+        with self.lock:
+            self.connection.close()
+
+    def get(self, video_path):
+        """
+        Return the stored record of one video (with any queued changes applied) or None.
+        """
+        # The writer holds the lock from taking a batch until it is committed,
+        # so every change is either still queued or already in the row
+        with self.lock:
+            with self.condition:
+                changes = dict(self.pending.get(video_path, {}))
+            row = self.connection.execute("SELECT data FROM videos WHERE path = ?", (video_path,)).fetchone()
+        record = json.loads(row[0]) if row else None
+        if changes:
+            record = dict(record or {}, **changes)
+        return record
+
+    def update(self, video_path, **fields):
+        """
+        Queue changed fields of one video's record; other fields are kept.
+        """
+        with self.condition:
+            self.pending.setdefault(video_path, {}).update(fields)
+            self.condition.notify()
+        if not self.running:
+            self._flush()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+            self._flush()
+
+    def _flush(self):
+        with self.lock:
+            with self.condition:
+                pending, self.pending = self.pending, {}
+            for video_path, changes in pending.items():
+                try:
+                    self._write(video_path, changes)
+                except Exception as e:
+                    logging.error(f"Error saving persisted data for {video_path}: {e}")
+
+    def _write(self, video_path, changes):
+        # One transaction per video: a crash leaves either the old or the new record.
+        # Called with self.lock held.
+        with self.connection:
+            row = self.connection.execute("SELECT data FROM videos WHERE path = ?", (video_path,)).fetchone()
+            record = json.loads(row[0]) if row else {}
+            record.update(changes)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO videos (path, data, updated) VALUES (?, ?, ?)",
+                (video_path, json.dumps(record), time.time())
+            )
@@ -0,0 +1,313 @@
+import sys
+import time
+import queue
+import logging
+import threading
+
+
+class PlaybackClock:
+    """
+    Single owner of the player's periodic work (slider, time label, subtitle panes).
+    Every task keeps at most one outstanding Tk after() handle, so a task can be
+    re-triggered or re-timed without starting a second refresh chain.
+    While playback is paused the tasks stop and only a cheap idle check keeps running,
+    or nothing at all when play/pause is reported by events (is_playing=None).
+    """
+
+    def __init__(self, widget, is_playing, idle_check_ms=500):
+        """
+        Args:
+            widget: Any Tk widget, used for after()/after_cancel()
+            is_playing (callable): Returns True while the media is playing. Pass None when
+                pause()/resume() are driven by player events; the clock then never polls.
+            idle_check_ms (int): How often to look for playback resuming while paused
+        """
+        self.widget = widget
+        self.is_playing = is_playing
+        self.idle_check_ms = idle_check_ms
+        self.tasks = {}
+        self.running = False
+        self.paused = True
+        self._idle_handle = None
+
+    def add_task(self, name, callback, interval_ms):
+        """
+        Register periodic work. The callback takes no arguments.
+        If it returns a number, that is the delay in ms until it is next due (e.g. the
+        next subtitle boundary); the task's interval then acts as an upper bound.
+        A task with interval_ms=None and no returned delay only runs when triggered.
+        """
+        self.tasks[name] = {'callback': callback, 'interval': interval_ms, 'handle': None}
+        if self.running and not self.paused:
+            self._schedule(name)
+
+    def set_interval(self, name, interval_ms):
+        """
+        Change how often a task runs; takes effect from the next tick.
+        """
+        task = self.tasks[name]
+        task['interval'] = interval_ms
+        if task['handle'] is not None:
+            self._schedule(name)
+
+    def start(self):
+        self.running = True
+        if self.is_playing is not None:
+            self._watch()
+
+    def stop(self):
+        self.running = False
+        self._cancel_all()
+
+    def pause(self):
+        """
+        Stop the periodic tasks and wait for playback to resume.
+        """
+        self.paused = True
+        self._cancel_all()
+        if self.running and self.is_playing is not None:
+            self._idle_handle = self.widget.after(self.idle_check_ms, self._watch)
+
+    def resume(self):
+        """
+        Restart all tasks immediately, e.g. right after the user pressed play.
+        """
+        if not self.running:
+            return
+        self.paused = False
+        self._cancel_all()
+        for name in self.tasks:
+            self._run(name)
+
+    def trigger(self, name):
+        """
+        Run a task now, e.g. after a seek or after loading subtitles, even when paused.
+        The task's next tick is rescheduled from now instead of being duplicated.
+        """
+        if not self.running:
+            return
+        if self.paused:
+            self._call(name)
+            return
+        task = self.tasks[name]
+        if task['handle'] is not None:
+            self.widget.after_cancel(task['handle'])
+        self._run(name)
+
+    def _run(self, name):
+        task = self.tasks[name]
+        task['handle'] = None
+        if not self.running or self.paused:
+            return
+        if self.is_playing is not None and not self.is_playing():
+            self.pause()
+            return
+        delay = self._call(name)
+        self._schedule(name, delay)
+
+    def _call(self, name):
+        try:
+            return self.tasks[name]['callback']()
+        except Exception as e:
+            logging.error(f"Error in playback task '{name}': {e}")
+            return None
+
+    def _schedule(self, name, delay=None):
+        task = self.tasks[name]
+        if task['handle'] is not None:
+            self.widget.after_cancel(task['handle'])
+            task['handle'] = None
+        interval = task['interval']
+        if delay is not None:
+            interval = delay if interval is None else min(delay, interval)
+        if interval is None:
+            return
+        task['handle'] = self.widget.after(max(1, int(interval)), lambda: self._run(name))
+
+    def _watch(self):
+        self._idle_handle = None
+        if not self.running:
+            return
+        if self.is_playing():
+            self.resume()
+        else:
+            self._idle_handle = self.widget.after(self.idle_check_ms, self._watch)
+
+    def _cancel_idle(self):
+        if self._idle_handle is not None:
+            self.widget.after_cancel(self._idle_handle)
+            self._idle_handle = None
+
+    def _cancel_all(self):
+        self._cancel_idle()
+        for task in self.tasks.values():
+            if task['handle'] is not None:
+                self.widget.after_cancel(task['handle'])
+                task['handle'] = None
+
+
+# How often the Tk thread picks up values posted by other threads
+BRIDGE_POLL_MS = 20
+# After wake() the queue is polled at least this long, for the player's answer to arrive
+BRIDGE_LINGER_MS = 1000
+
+
+class ThreadBridge:
+    """
+    Delivers values posted from background threads to handlers on the Tk thread.
+    Posting puts the value on a queue, which the Tk thread drains every
+    BRIDGE_POLL_MS. Values of the same name that arrive within one drain are
+    coalesced, so only the latest one (e.g. the newest playback time) is delivered.
+
+    While is_active() is false (e.g. playback is paused) and the queue is empty the
+    bridge goes dormant and stops polling. A post from a worker thread then re-arms
+    it with a single after_idle(); a post with wake=False (VLC callbacks) never calls
+    into Tk, as a Tk call from a VLC thread blocks it until the main loop serviced
+    it, and is delivered on the next wake() from the Tk thread.
+    """
+
+    def __init__(self, widget, poll_ms=BRIDGE_POLL_MS, is_active=None, linger_ms=BRIDGE_LINGER_MS):
+        """
+        Args:
+            widget: Tk widget, used for after()/after_idle()/after_cancel()
+            poll_ms (int): How often the queue is drained
+            is_active (callable): Returns False when the bridge may stop polling; None polls always
+            linger_ms (int): How long the bridge keeps polling after wake()
+        """
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.is_active = is_active
+        self.linger_ms = linger_ms
+        self.handlers = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.stopped = False
+        self.dormant = False
+        self.awake_until = time.monotonic() + linger_ms / 1000
+        self.poll_handle = self.widget.after(self.poll_ms, self._dispatch)
+
+    def add_handler(self, name, handler):
+        """
+        Call handler(value) on the Tk thread for every value posted under name.
+        """
+        self.handlers[name] = handler
+
+    def post(self, name, value=None, wake=True):
+        """
+        Hand a value to the Tk thread. Safe to call from any thread.
+
+        Args:
+            wake (bool): Re-arm a dormant bridge. Pass False from threads that must not call Tk.
+        """
+        self.queue.put((name, value))
+        if not wake:
+            return
+        with self.lock:
+            if not self.dormant or self.stopped:
+                return
+            self.dormant = False
+        try:
+            self.poll_handle = self.widget.after_idle(self._dispatch)
+        except Exception as e:
+            logging.error(f"Error waking the event bridge for '{name}': {e}")
+            with self.lock:
+                self.dormant = True
+
+    def wake(self):
+        """
+        Poll for at least linger_ms from now, e.g. after asking the player to play,
+        pause or seek. Tk thread only.
+        """
+        self.awake_until = time.monotonic() + self.linger_ms / 1000
+        with self.lock:
+            if not self.dormant or self.stopped:
+                return
+            self.dormant = False
+        self.poll_handle = self.widget.after_idle(self._dispatch)
+
+    def stop(self):
+        """
+        Stop delivering values; later posts are dropped with the queue.
+        """
+        with self.lock:
+            self.stopped = True
+        if self.poll_handle is not None:
+            self.widget.after_cancel(self.poll_handle)
+            self.poll_handle = None
+
+    def _dispatch(self):
+        self.poll_handle = None
+        pending = {}
+        while True:
+            try:
+                name, value = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            pending[name] = value
+        for name, value in pending.items():
+            try:
+                self.handlers[name](value)
+            except Exception as e:
+                logging.error(f"Error handling posted event '{name}': {e}")
+        with self.lock:
+            if self.stopped:
+                return
+            # Checked under the lock, so a post that follows either sees dormant or gets polled
+            if (self.queue.empty() and self.is_active is not None and not self.is_active()
+                    and time.monotonic() >= self.awake_until):
+                self.dormant = True
+                return
+        self.poll_handle = self.widget.after(self.poll_ms, self._dispatch)
+
+
+class VlcEventBridge(ThreadBridge):
+    """
+    ThreadBridge that also forwards libVLC events, which arrive on a VLC thread.
+    """
+
+    def __init__(self, widget, is_active=None):
+        super().__init__(widget, is_active=is_active)
+        self.attached = []
+
+    def attach(self, event_manager, event_type, name, handler, payload=None):
+        """
+        Deliver a VLC event to handler(value) on the Tk thread.
+
+        Args:
+            event_manager: VLC event manager, e.g. player.event_manager()
+            event_type: VLC event type to listen for
+            name (str): Coalescing key; several event types may share one (e.g. play state)
+            handler (callable): Called on the Tk thread with the payload
+            payload (callable): Extracts the value from the VLC event on the VLC thread
+        """
+        def callback(event):
+            # Runs on a VLC thread: only queues the value, never calls Tk
+            self.post(name, payload(event) if payload else None, wake=False)
+
+        event_manager.event_attach(event_type, callback)
+        self.attached.append((event_manager, event_type))
+        self.add_handler(name, handler)
+
+    def detach(self):
+        for event_manager, event_type in self.attached:
+            try:
+                event_manager.event_detach(event_type)
+            except Exception as e:
+                logging.error(f"Error detaching VLC event {event_type}: {e}")
+        self.attached = []
+
+
+def set_video_output(player, window_id):
+    """
+    Render a VLC media player into a native window (e.g. a Tk frame's winfo_id()).
+    Raises RuntimeError on platforms VLC cannot embed into.
+    """
+    if sys.platform.startswith('linux'):  # for Linux using the X Server
+        player.set_xwindow(window_id)
+    elif sys.platform == "win32":  # for Windows
+        player.set_hwnd(window_id)
+    elif sys.platform == "darwin":  # for MacOS
+        from ctypes import c_void_p
+        player.set_nsobject(c_void_p(window_id))
+    else:
+        raise RuntimeError("Unsupported OS.")
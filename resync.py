@@ -0,0 +1,213 @@
+import sys
+import os
+import logging
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+from subtitles import CueIndex, load_srt, write_srt
+from alignment import FRAME_RATE_RATIOS, MAX_OFFSET
+
+SAMPLE_RATE = 8000
+FRAME_SECONDS = 0.01
+FRAME_SAMPLES = int(SAMPLE_RATE * FRAME_SECONDS)
+# Audio is read and reduced to frame energies this many seconds at a time
+CHUNK_SECONDS = 30
+PRE_EMPHASIS = 0.97
+# Frames this much louder than the quiet floor of the track count as speech
+SPEECH_MARGIN_DB = 10.0
+SPEECH_SMOOTHING_SECONDS = 0.2
+# Drift is measured on windows of this length, each searched this far around the global offset
+SEGMENT_SECONDS = 600
+SEGMENT_SEARCH_SECONDS = 5.0
+MIN_SEGMENT_SCORE = 0.05
+# Segment offsets further than this from the fitted line are treated as outliers
+DRIFT_OUTLIER_SECONDS = 1.0
+
+
+def speech_activity(video_file, audio_index=0):
+    """
+    Stream one audio track through ffmpeg as low-rate mono PCM and mark the 10 ms
+    frames that likely contain speech. Only CHUNK_SECONDS of samples are held at a
+    time; what is kept is one energy value per frame.
+
+    Args:
+        video_file (str): Video (or audio) file
+        audio_index (int): Audio stream among the file's audio streams (ffmpeg 0:a:N)
+
+    Returns:
+        numpy.ndarray: float32 speech activity per frame, 0 or 1
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", video_file,
+        "-map", f"0:a:{audio_index}",
+        "-vn", "-sn",
+        "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "s16le", "-"
+    ]
+    chunk_bytes = CHUNK_SECONDS * SAMPLE_RATE * 2
+    energies = []
+    carry = np.zeros(0, dtype=np.float32)  # Samples of an incomplete frame
+    previous = 0.0  # Sample before carry, for the pre-emphasis filter
+    # Decode errors go to a file: a full stderr pipe would stall ffmpeg while stdout is read
+    with tempfile.TemporaryFile() as error_file:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=error_file)
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            samples = np.concatenate((carry, np.frombuffer(data[:len(data) // 2 * 2], dtype='<i2').astype(np.float32)))
+            # Pre-emphasis keeps hum and music bass from looking like speech
+            emphasized = samples - PRE_EMPHASIS * np.concatenate(([previous], samples[:-1]))
+            count = len(samples) // FRAME_SAMPLES
+            if count:
+                frames = emphasized[:count * FRAME_SAMPLES].reshape(count, FRAME_SAMPLES)
+                energies.append((10 * np.log10(np.mean(frames * frames, axis=1) + 1)).astype(np.float32))
+                previous = samples[count * FRAME_SAMPLES - 1]
+            carry = samples[count * FRAME_SAMPLES:]
+        process.stdout.close()
+        if process.wait() != 0:
+            error_file.seek(0)
+            error = error_file.read()[-2000:].decode('utf-8', errors='replace')
+            raise RuntimeError(f"ffmpeg failed to decode audio of {video_file}: {error.strip()}")
+    if not energies:
+        raise RuntimeError(f"No audio decoded from {video_file}")
+
+    energy = np.concatenate(energies)
+    speech = (energy > np.percentile(energy, 10) + SPEECH_MARGIN_DB).astype(np.float32)
+    width = max(1, int(SPEECH_SMOOTHING_SECONDS / FRAME_SECONDS))
+    return (np.convolve(speech, np.ones(width, dtype=np.float32) / width, mode='same') > 0.5).astype(np.float32)
+
+
+def cue_activity(subtitles, length, scale=1.0):
+    """
+    Per-frame 0/1 timeline of when a cue is shown, with cue times multiplied by scale.
+    """
+    starts = np.clip((np.frombuffer(subtitles.starts, dtype=np.float64) * scale / FRAME_SECONDS).astype(np.int64), 0, length)
+    ends = np.clip((np.frombuffer(subtitles.ends, dtype=np.float64) * scale / FRAME_SECONDS).astype(np.int64), 0, length)
+    edges = np.zeros(length + 1, dtype=np.int32)
+    np.add.at(edges, starts, 1)
+    np.add.at(edges, ends, -1)
+    return (np.cumsum(edges)[:length] > 0).astype(np.float32)
+
+
+def cross_correlate(speech, cues, max_lag):
+    """
+    Lag (frames) with speech[t] best matching cues[t - lag], searched within
+    +-max_lag, and its normalized correlation. Computed with FFTs.
+    """
+    a = speech - speech.mean()
+    b = cues - cues.mean()
+    size = 1 << (len(a) + len(b)).bit_length()
+    correlation = np.fft.irfft(np.fft.rfft(a, size) * np.conj(np.fft.rfft(b, size)), size)
+    max_lag = min(max_lag, size // 2 - 1)
+    lags = np.concatenate((np.arange(0, max_lag + 1), np.arange(-max_lag, 0)))
+    values = np.concatenate((correlation[:max_lag + 1], correlation[size - max_lag:]))
+    best = int(np.argmax(values))
+    norm = np.sqrt(np.dot(a, a) * np.dot(b, b)) or 1.0
+    return int(lags[best]), float(values[best] / norm)
+
+
+def window(values, start, length):
+    """
+    values[start:start + length], zero-padded where the range leaves the array.
+    """
+    result = np.zeros(length, dtype=values.dtype)
+    source_start, source_end = max(0, start), min(len(values), start + length)
+    if source_end > source_start:
+        result[source_start - start:source_end - start] = values[source_start:source_end]
+    return result
+
+
+def find_sync(speech, subtitles, max_offset=MAX_OFFSET):
+    """
+    Find the linear correction audio time = scale * subtitle time + offset.
+    A global search over frame rate ratios and offsets is refined by local
+    offsets of SEGMENT_SECONDS windows, whose trend gives the drift.
+
+    Returns:
+        dict: scale, offset (seconds), score of the global match, segments used for the drift
+    """
+    length = len(speech)
+    best = None
+    for ratio in FRAME_RATE_RATIOS:
+        lag, score = cross_correlate(speech, cue_activity(subtitles, length, ratio), int(max_offset / FRAME_SECONDS))
+        if best is None or score > best[2]:
+            best = (ratio, lag, score)
+    ratio, lag, score = best
+    cues = cue_activity(subtitles, length, ratio)
+
+    segment, search = int(SEGMENT_SECONDS / FRAME_SECONDS), int(SEGMENT_SEARCH_SECONDS / FRAME_SECONDS)
+    times, offsets = [], []
+    for start in range(0, length, segment):
+        cue_window = cues[start:start + segment]
+        if cue_window.mean() < 0.1:
+            continue  # Too little dialogue to measure
+        speech_window = window(speech, start + lag, len(cue_window))
+        local_lag, local_score = cross_correlate(speech_window, cue_window, search)
+        if local_score >= MIN_SEGMENT_SCORE:
+            times.append((start + len(cue_window) / 2) * FRAME_SECONDS)
+            offsets.append((lag + local_lag) * FRAME_SECONDS)
+
+    drift, offset = 0.0, lag * FRAME_SECONDS
+    if len(times) >= 3:
+        times, offsets = np.array(times), np.array(offsets)
+        fit = np.polyfit(times, offsets, 1)
+        inliers = np.abs(np.polyval(fit, times) - offsets) <= DRIFT_OUTLIER_SECONDS
+        if inliers.sum() >= 3:
+            drift, offset = np.polyfit(times[inliers], offsets[inliers], 1)
+    # offset(t) = drift * t + offset on the ratio-scaled timeline
+    return {
+        'scale': float(ratio * (1 + drift)),
+        'offset': float(offset),
+        'score': score,
+        'segments': len(times),
+    }
+
+
+def apply_sync(subtitles, scale, offset):
+    """
+    CueIndex with every time mapped to scale * time + offset (cues before 0 are clamped).
+    """
+    return CueIndex((max(0.0, start * scale + offset), max(0.0, end * scale + offset), content)
+                    for start, end, content in subtitles)
+
+
+def resync_subtitles(video_file, srt_file, output_file=None, audio_index=0):
+    """
+    Write a copy of srt_file synchronized to an audio track of video_file.
+
+    Returns:
+        tuple: (output file, sync dict from find_sync)
+    """
+    output_file = output_file or f"{os.path.splitext(srt_file)[0]}.resync.srt"
+    subtitles = load_srt(srt_file)
+    speech = speech_activity(video_file, audio_index)
+    sync = find_sync(speech, subtitles)
+    write_srt(apply_sync(subtitles, sync['scale'], sync['offset']), output_file)
+    logging.info(f"Resynced {srt_file}: offset {sync['offset']:+.2f} s, speed x{sync['scale']:.5f} "
+                 f"(match {sync['score']:.2f}, {sync['segments']} segment(s)) -> {output_file}")
+    return output_file, sync
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Synchronize an SRT file to the speech in a video's audio track.")
+    parser.add_argument("video", help="Video or audio file")
+    parser.add_argument("srt", help="Subtitle file to synchronize")
+    parser.add_argument("-o", "--output", help="Output SRT (default: <srt name>.resync.srt)")
+    parser.add_argument("-a", "--audio-track", type=int, default=0,
+                        help="Audio stream to listen to, counted among the audio streams (default: 0)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    try:
+        resync_subtitles(args.video, args.srt, args.output, args.audio_track)
+    except Exception as e:
+        logging.error(f"Error resyncing {args.srt}: {e}")
+        sys.exit(1)
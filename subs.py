@@ -1,13 +1,35 @@
 import sys
 import os
 import json
+import glob
+import time
+import hashlib
+import threading
+import argparse
 import subprocess
 import logging
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov")
+
+# Per-directory sidecar that remembers what was probed and extracted for each video
+MANIFEST_NAME = ".subs_manifest.json"
+HASH_CHUNK_SIZE = 64 * 1024
+# A changed manifest is written after this many updates and once more by flush_manifests()
+MANIFEST_SAVE_EVERY = 50
+
+_manifests = {}
+_unsaved_changes = {}
+_manifest_lock = threading.Lock()
+
+# Full-text index of the extracted subtitles, shared by the batch workers
+_subtitle_index = None
+_subtitle_index_lock = threading.Lock()
+
 def check_ffmpeg():
     try:
         subprocess.run(["ffmpeg", "-version"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -15,7 +37,158 @@ def check_ffmpeg():
     except FileNotFoundError:
         return False
 
-def get_subtitle_streams(video_file):
+def partial_hash(video_file, size):
+    """
+    Hash the first, middle and last chunk of a file. Cheap even for multi-GB videos,
+    and enough to tell a touched or copied file from a re-encoded one.
+    """
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(video_file, 'rb') as f:
+        for offset in sorted({0, max(0, size // 2 - HASH_CHUNK_SIZE // 2), max(0, size - HASH_CHUNK_SIZE)}):
+            f.seek(offset)
+            digest.update(f.read(HASH_CHUNK_SIZE))
+    return digest.hexdigest()
+
+def load_manifest(directory):
+    """
+    Return the manifest of a directory, reading it from disk on first use.
+    Must be called with _manifest_lock held.
+    """
+    directory = os.path.abspath(directory)
+    if directory not in _manifests:
+        manifest = {}
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except Exception as e:
+                logging.error(f"Error loading manifest {manifest_path}: {e}")
+        _manifests[directory] = manifest
+    return _manifests[directory]
+
+def save_manifest(directory):
+    """
+    Atomically write a directory's manifest. Must be called with _manifest_lock held.
+    """
+    directory = os.path.abspath(directory)
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    try:
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(_manifests.get(directory, {}), f, indent=1)
+        os.replace(tmp_path, manifest_path)
+        _unsaved_changes.pop(directory, None)
+    except Exception as e:
+        logging.error(f"Error saving manifest {manifest_path}: {e}")
+
+def mark_manifest_changed(directory):
+    """
+    Note a change to a directory's manifest, saving it every MANIFEST_SAVE_EVERY changes
+    so a batch over one folder does not rewrite the whole file per video.
+    Must be called with _manifest_lock held.
+    """
+    directory = os.path.abspath(directory)
+    _unsaved_changes[directory] = _unsaved_changes.get(directory, 0) + 1
+    if _unsaved_changes[directory] >= MANIFEST_SAVE_EVERY:
+        save_manifest(directory)
+
+def flush_manifests():
+    """
+    Write every manifest with unsaved changes; call when a run is done.
+    """
+    with _manifest_lock:
+        for directory in list(_unsaved_changes):
+            save_manifest(directory)
+
+def get_cached_entry(video_file):
+    """
+    Return the manifest entry for a video if it still describes the file on disk, else None.
+    A matching size and mtime costs a single stat(). If only the mtime changed, the
+    partial hash decides whether the entry is still valid.
+    """
+    directory, name = os.path.split(os.path.abspath(video_file))
+    st = os.stat(video_file)
+    with _manifest_lock:
+        entry = load_manifest(directory).get(name)
+    if not entry or entry.get('size') != st.st_size:
+        return None
+    if entry.get('mtime_ns') == st.st_mtime_ns:
+        return entry
+    if entry.get('hash') != partial_hash(video_file, st.st_size):
+        return None
+    with _manifest_lock:
+        entry['mtime_ns'] = st.st_mtime_ns
+        mark_manifest_changed(directory)
+    return entry
+
+def update_cached_entry(video_file, streams=None, outputs=None, failed=None, probe_error=None):
+    """
+    Record probed streams, produced SRT files and/or failures for a video. Failed
+    SRT outputs and a failed probe are skipped by later runs until the video changes:
+    a new fingerprint is taken when the video has no valid entry yet, dropping
+    anything recorded for older content.
+    """
+    directory, name = os.path.split(os.path.abspath(video_file))
+    entry = get_cached_entry(video_file)
+    if entry is None:
+        st = os.stat(video_file)
+        entry = {
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'hash': partial_hash(video_file, st.st_size),
+            'outputs': {},
+        }
+    with _manifest_lock:
+        if streams is not None:
+            entry['streams'] = streams
+            entry.pop('probe_error', None)
+        if probe_error is not None:
+            entry['probe_error'] = probe_error
+        failed_outputs = set(entry.get('failed', []))
+        for srt_file in outputs or []:
+            failed_outputs.discard(os.path.basename(srt_file))
+            try:
+                srt_stat = os.stat(srt_file)
+                entry['outputs'][os.path.basename(srt_file)] = {'size': srt_stat.st_size, 'mtime_ns': srt_stat.st_mtime_ns}
+            except OSError:
+                entry['outputs'].pop(os.path.basename(srt_file), None)
+        for srt_file in failed or []:
+            failed_outputs.add(os.path.basename(srt_file))
+            entry['outputs'].pop(os.path.basename(srt_file), None)
+        if failed_outputs:
+            entry['failed'] = sorted(failed_outputs)
+        else:
+            entry.pop('failed', None)
+        load_manifest(directory)[name] = entry
+        mark_manifest_changed(directory)
+
+def is_output_up_to_date(entry, srt_file):
+    """
+    Check that an SRT file was produced for the cached video content and has not been touched since.
+    """
+    if not entry:
+        return False
+    recorded = entry.get('outputs', {}).get(os.path.basename(srt_file))
+    try:
+        srt_stat = os.stat(srt_file)
+    except OSError:
+        return False
+    return bool(recorded) and recorded['size'] == srt_stat.st_size and recorded['mtime_ns'] == srt_stat.st_mtime_ns
+
+def get_subtitle_streams(video_file, use_cache=True):
+    if use_cache:
+        try:
+            entry = get_cached_entry(video_file)
+            if entry and 'streams' in entry:
+                logging.info(f"Using cached stream list for: {video_file}")
+                return entry['streams']
+            if entry and 'probe_error' in entry:
+                logging.info(f"Skipping {video_file}: ffprobe failed on it before ({entry['probe_error']})")
+                return []
+        except Exception as e:
+            logging.error(f"Error reading extraction cache: {e}")
+
     try:
         # Get video file information in JSON format
         process = subprocess.Popen([
@@ -30,39 +203,45 @@ def get_subtitle_streams(video_file):
         stdout, stderr = process.communicate()
         
         if process.returncode != 0:
-            logging.error(f"FFprobe error: {stderr.decode('utf-8', errors='replace')}")
+            error = stderr.decode('utf-8', errors='replace').strip()
+            logging.error(f"FFprobe error: {error}")
+            try:
+                update_cached_entry(video_file, probe_error=error[-500:] or f"exit code {process.returncode}")
+            except Exception as e:
+                logging.error(f"Error updating extraction cache: {e}")
             return []
             
         # Decode the output using utf-8 with error handling
         try:
             output = stdout.decode('utf-8', errors='replace')
             info = json.loads(output)
-            return info.get("streams", [])
+            streams = info.get("streams", [])
         except json.JSONDecodeError as e:
             logging.error(f"Error decoding JSON: {e}")
             return []
+
+        try:
+            update_cached_entry(video_file, streams=streams)
+        except Exception as e:
+            logging.error(f"Error updating extraction cache: {e}")
+        return streams
             
     except Exception as e:
         logging.error(f"Error getting subtitle information: {str(e)}")
         return []
 
-def extract_subtitles(video_file):
-    logging.info(f"Starting subtitle extraction for: {video_file}")
-
+def plan_subtitle_outputs(video_file, subtitle_streams):
+    """
+    Build the list of (stream_index, language, srt_file) outputs for the given streams.
+    Streams sharing a language get a numeric suffix: movie.eng.srt, movie.eng_2.srt, ...
+    """
     # Get the file name without extension and the directory
-    file_name = os.path.splitext(video_file)[0]
+    file_name = os.path.basename(os.path.splitext(video_file)[0])
     directory = os.path.dirname(video_file)
 
-    # Get subtitle streams
-    subtitle_streams = get_subtitle_streams(video_file)
-    logging.info(f"Found {len(subtitle_streams)} subtitle stream(s).")
-
-    if not subtitle_streams:
-        logging.warning("No subtitle streams found in the video file.")
-        return
-
     # Dictionary to keep track of the number of streams per language
     lang_count = defaultdict(int)
+    outputs = []
 
     for index, stream in enumerate(subtitle_streams):
         # Get language tag or use 'und' with stream index if not available
@@ -80,21 +259,219 @@ def extract_subtitles(video_file):
 
         # Output SRT file path with unique filename
         srt_file = os.path.join(directory, f"{file_name}.{lang}{suffix}.srt")
+        outputs.append((index, lang, srt_file))
+
+    return outputs
 
+def extract_all_streams(video_file, outputs):
+    """
+    Extract every planned subtitle stream in a single ffmpeg run, so the video is
+    read and demuxed only once no matter how many subtitle tracks it has.
+    Returns True on success.
+    """
+    command = ["ffmpeg", "-y", "-nostdin", "-loglevel", "error", "-i", video_file]
+    for index, lang, srt_file in outputs:
         logging.info(f"Processing subtitle stream {index}: Language='{lang}', Output='{srt_file}'")
+        command += ["-map", f"0:s:{index}", "-f", "srt", srt_file]
+
+    try:
+        subprocess.run(command, check=True)
+        logging.info(f"Extracted {len(outputs)} subtitle stream(s) in a single pass.")
+        return True
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Single-pass subtitle extraction failed: {e}")
+        return False
 
+def extract_stream(video_file, index, lang, srt_file):
+    """
+    Extract a single subtitle stream with its own ffmpeg run.
+    Returns True on success.
+    """
+    logging.info(f"Processing subtitle stream {index}: Language='{lang}', Output='{srt_file}'")
+
+    try:
+        # Extract subtitles using ffmpeg with specified format and without capturing output
+        subprocess.run([
+            "ffmpeg", "-y", "-nostdin",
+            "-loglevel", "error",
+            "-i", video_file,
+            "-map", f"0:s:{index}",
+            "-f", "srt",
+            srt_file
+        ], check=True)
+        logging.info(f"Subtitles extracted successfully: {srt_file}")
+        return True
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Error extracting subtitles for stream {index}: {e}")
+        return False
+
+def index_subtitle_files(video_file, srt_files):
+    """
+    Add extracted SRT files to the full-text subtitle index used by the player's search.
+    """
+    global _subtitle_index
+    try:
+        from subtitle_index import SubtitleIndex
+        with _subtitle_index_lock:
+            if _subtitle_index is None:
+                _subtitle_index = SubtitleIndex()
+        for srt_file in srt_files:
+            _subtitle_index.add_file(srt_file, video_file)
+    except Exception as e:
+        logging.error(f"Error indexing subtitles of {video_file}: {e}")
+
+def extract_subtitles(video_file, single_pass=True, force=False, index=True):
+    """
+    Extract all subtitle streams of a video to SRT files next to it.
+    Streams whose SRT output is recorded in the manifest and unchanged are skipped,
+    and so are streams that failed to extract from the same video content before.
+
+    Args:
+        video_file (str): Path to the video
+        single_pass (bool): Map all streams in one ffmpeg run. If that run fails
+            (e.g. one stream is a bitmap format that cannot become SRT), fall back
+            to extracting the streams one by one so the others are still written.
+        force (bool): Ignore the manifest, re-probe and re-extract everything, failures included
+        index (bool): Add the written SRT files to the full-text subtitle index
+
+    Returns:
+        tuple: (written SRT paths, indexes of streams that failed)
+    """
+    logging.info(f"Starting subtitle extraction for: {video_file}")
+
+    # Get subtitle streams
+    subtitle_streams = get_subtitle_streams(video_file, use_cache=not force)
+    logging.info(f"Found {len(subtitle_streams)} subtitle stream(s).")
+
+    if not subtitle_streams:
+        logging.warning("No subtitle streams found in the video file.")
+        return [], []
+
+    outputs = plan_subtitle_outputs(video_file, subtitle_streams)
+
+    if not force:
         try:
-            # Extract subtitles using ffmpeg with specified format and without capturing output
-            subprocess.run([
-                "ffmpeg",
-                "-i", video_file,
-                "-map", f"0:s:{index}",
-                "-f", "srt",
-                srt_file
-            ], check=True)
-            logging.info(f"Subtitles extracted successfully: {srt_file}")
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Error extracting subtitles for stream {index}: {e}")
+            entry = get_cached_entry(video_file)
+        except Exception as e:
+            logging.error(f"Error reading extraction cache: {e}")
+            entry = None
+        pending = [output for output in outputs if not is_output_up_to_date(entry, output[2])]
+        if len(pending) < len(outputs):
+            logging.info(f"Skipping {len(outputs) - len(pending)} up-to-date subtitle file(s).")
+        failed_before = set(entry.get('failed', [])) if entry else set()
+        outputs = [output for output in pending if os.path.basename(output[2]) not in failed_before]
+        if len(outputs) < len(pending):
+            logging.info(f"Skipping {len(pending) - len(outputs)} stream(s) that failed to extract before.")
+        if not outputs:
+            return [], []
+
+    written, failed, failed_files = [], [], []
+    if single_pass and len(outputs) > 1:
+        if extract_all_streams(video_file, outputs):
+            written = [srt_file for _, _, srt_file in outputs]
+        else:
+            logging.info("Falling back to per-stream extraction.")
+
+    if not written:
+        for stream_index, lang, srt_file in outputs:
+            if extract_stream(video_file, stream_index, lang, srt_file):
+                written.append(srt_file)
+            else:
+                failed.append(stream_index)
+                failed_files.append(srt_file)
+
+    try:
+        update_cached_entry(video_file, outputs=written, failed=failed_files)
+    except Exception as e:
+        logging.error(f"Error updating extraction cache: {e}")
+    if index and written:
+        index_subtitle_files(video_file, written)
+    return written, failed
+
+def collect_video_files(paths):
+    """
+    Expand files, directories (searched recursively) and glob patterns into a
+    sorted list of video files. Explicitly named files are kept whatever their extension.
+    """
+    found = set()
+    for path in paths:
+        matches = glob.glob(path, recursive=True) if glob.has_magic(path) else [path]
+        if not matches:
+            logging.warning(f"No files match '{path}'.")
+        for match in matches:
+            if os.path.isdir(match):
+                for root, _, files in os.walk(match):
+                    for name in files:
+                        if name.lower().endswith(VIDEO_EXTENSIONS):
+                            found.add(os.path.join(root, name))
+            elif os.path.isfile(match):
+                if match == path or match.lower().endswith(VIDEO_EXTENSIONS):
+                    found.add(match)
+            else:
+                logging.error(f"Error: File '{match}' not found.")
+    return sorted(found)
+
+def process_video(video_file, single_pass=True, force=False, index=True):
+    """
+    Batch worker: extract one video's subtitles and time it.
+    Returns a result dict for the summary.
+    """
+    started = time.perf_counter()
+    try:
+        written, failed = extract_subtitles(video_file, single_pass=single_pass, force=force, index=index)
+        error = f"{len(failed)} stream(s) failed" if failed else None
+    except Exception as e:
+        logging.error(f"Error processing {video_file}: {e}")
+        written, error = [], str(e)
+    return {
+        'video': video_file,
+        'ok': error is None,
+        'written': len(written),
+        'error': error,
+        'seconds': time.perf_counter() - started,
+    }
+
+def extract_batch(video_files, jobs=None, single_pass=True, force=False, index=True):
+    """
+    Extract subtitles for many videos on a bounded thread pool. The heavy lifting
+    happens in ffprobe/ffmpeg child processes, so threads are enough to keep every core busy.
+    Returns the per-file results in input order.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=min(jobs, max(1, len(video_files)))) as pool:
+            futures = {pool.submit(process_video, video_file, single_pass, force, index): video_file for video_file in video_files}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    finally:
+        flush_manifests()
+    return [results[video_file] for video_file in video_files]
+
+def print_summary(results, elapsed):
+    """
+    Print per-file status and timings followed by totals.
+    """
+    print()
+    for result in results:
+        status = "OK  " if result['ok'] else "FAIL"
+        detail = f"{result['written']} srt" if result['ok'] else result['error']
+        print(f"{status} {result['seconds']:8.2f}s  {detail:<20} {result['video']}")
+    failed = sum(1 for result in results if not result['ok'])
+    print(f"\n{len(results)} file(s), {len(results) - failed} succeeded, {failed} failed in {elapsed:.2f}s")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract subtitle streams from videos to SRT files.")
+    parser.add_argument("paths", nargs="+", help="Video files, directories or glob patterns")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of videos processed in parallel (default: number of cores)")
+    parser.add_argument("--per-stream", action="store_true",
+                        help="Run ffmpeg once per subtitle stream instead of a single pass")
+    parser.add_argument("--force", action="store_true",
+                        help=f"Ignore the {MANIFEST_NAME} cache and re-extract everything")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Do not add the extracted subtitles to the player's search index")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
     if not check_ffmpeg():
@@ -102,13 +479,22 @@ if __name__ == "__main__":
         logging.info("Please install FFmpeg and ensure it's accessible from the command line.")
         sys.exit(1)
 
-    if len(sys.argv) != 2:
-        logging.error("Usage: python subs.py <video_file>")
+    args = parse_args()
+    video_files = collect_video_files(args.paths)
+    if not video_files:
+        logging.error("No video files to process.")
         sys.exit(1)
 
-    video_file = sys.argv[1]
-    if not os.path.exists(video_file):
-        logging.error(f"Error: File '{video_file}' not found.")
-        sys.exit(1)
+    if len(video_files) == 1:
+        try:
+            _, failed = extract_subtitles(video_files[0], single_pass=not args.per_stream, force=args.force,
+                                          index=not args.no_index)
+        finally:
+            flush_manifests()
+        sys.exit(1 if failed else 0)
 
-    extract_subtitles(video_file)
\ No newline at end of file
+    started = time.perf_counter()
+    results = extract_batch(video_files, jobs=args.jobs, single_pass=not args.per_stream, force=args.force,
+                            index=not args.no_index)
+    print_summary(results, time.perf_counter() - started)
+    sys.exit(0 if all(result['ok'] for result in results) else 1)
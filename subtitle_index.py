@@ -0,0 +1,224 @@
+import sys
+import os
+import glob
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import namedtuple
+
+from subtitles import load_srt_cached
+from subs import VIDEO_EXTENSIONS
+
+SUBTITLE_INDEX_FILE = "subtitle_index.db"
+# Stored as PRAGMA user_version; older databases are rebuilt from scratch
+SUBTITLE_INDEX_VERSION = 2
+SEARCH_LIMIT = 200
+# Only this many matches are ranked: ranking every match of a common phrase takes seconds
+SEARCH_CANDIDATES = 2000
+
+SearchHit = namedtuple('SearchHit', ['video_path', 'srt_path', 'start', 'end', 'content'])
+
+
+def find_video_for_srt(srt_path):
+    """
+    Guess the video an SRT belongs to from its name: movie.eng_2.srt -> movie.mkv.
+    """
+    base = os.path.splitext(srt_path)[0]
+    while base:
+        for extension in VIDEO_EXTENSIONS:
+            if os.path.exists(base + extension):
+                return os.path.abspath(base + extension)
+        stripped = os.path.splitext(base)[0]
+        if stripped == base:
+            return None
+        base = stripped
+    return None
+
+
+def collect_srt_files(paths):
+    """
+    Expand SRT files, directories (searched recursively) and glob patterns.
+    """
+    found = set()
+    for path in paths:
+        for match in (glob.glob(path, recursive=True) if glob.has_magic(path) else [path]):
+            if os.path.isdir(match):
+                for root, _, files in os.walk(match):
+                    found.update(os.path.join(root, name) for name in files if name.lower().endswith(".srt"))
+            elif os.path.isfile(match):
+                found.add(match)
+            else:
+                logging.error(f"Error: File '{match}' not found.")
+    return sorted(found)
+
+
+def fts_phrase(text):
+    """
+    Quote text as one FTS5 phrase, so punctuation and operators in it are not syntax.
+    """
+    return '"' + " ".join(text.split()).replace('"', '""') + '"'
+
+
+class SubtitleIndex:
+    """
+    Full-text (SQLite FTS5) index of the cues of every SRT in the library.
+    Cues live in a plain table indexed by file; the FTS5 table only indexes their
+    text (external content, keyed by the cue's rowid), so a file's cues are found
+    and removed without scanning the full-text index.
+    A file is re-indexed only when its size or mtime changed. Safe to use from
+    several threads; searches use a connection of their own, so with WAL they
+    never wait for indexing running in the background.
+    """
+
+    def __init__(self, path=SUBTITLE_INDEX_FILE):
+        self.lock = threading.Lock()
+        self.read_lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        self.read_connection = sqlite3.connect(path, check_same_thread=False)
+
+    def _create_tables(self):
+        with self.connection:
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] != SUBTITLE_INDEX_VERSION:
+                # Version 1 kept the cues in the FTS table itself; its files are indexed again
+                self.connection.execute("DROP TABLE IF EXISTS cues_fts")
+                self.connection.execute("DROP TABLE IF EXISTS cues")
+                self.connection.execute("DROP TABLE IF EXISTS files")
+                self.connection.execute(f"PRAGMA user_version = {SUBTITLE_INDEX_VERSION}")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "id INTEGER PRIMARY KEY, srt_path TEXT UNIQUE, video_path TEXT, size INTEGER, mtime_ns INTEGER)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS cues ("
+                "id INTEGER PRIMARY KEY, file_id INTEGER, start REAL, end REAL, content TEXT)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS cues_file_id ON cues (file_id)")
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS cues_fts USING fts5("
+                "content, content='cues', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def _delete_file(self, file_id):
+        """
+        Remove a file and its cues; call inside a transaction with the lock held.
+        """
+        # External content tables are told which rows (and texts) to forget
+        self.connection.execute(
+            "INSERT INTO cues_fts (cues_fts, rowid, content) "
+            "SELECT 'delete', id, content FROM cues WHERE file_id = ?", (file_id,)
+        )
+        self.connection.execute("DELETE FROM cues WHERE file_id = ?", (file_id,))
+        self.connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def add_file(self, srt_path, video_path=None, subtitles=None):
+        """
+        Index an SRT unless it is unchanged since it was last indexed.
+
+        Args:
+            srt_path (str): Subtitle file
+            video_path (str): Video it belongs to; guessed from the file name if None
+            subtitles (CueIndex): Already parsed cues of the file, to avoid parsing it again
+
+        Returns:
+            bool: True if the file was (re-)indexed
+        """
+        srt_path = os.path.abspath(srt_path)
+        st = os.stat(srt_path)
+        video_path = os.path.abspath(video_path) if video_path else find_video_for_srt(srt_path)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT id, video_path, size, mtime_ns FROM files WHERE srt_path = ?", (srt_path,)
+            ).fetchone()
+            if row and (row[2], row[3]) == (st.st_size, st.st_mtime_ns):
+                if video_path and video_path != row[1]:
+                    self.connection.execute("UPDATE files SET video_path = ? WHERE id = ?", (video_path, row[0]))
+                    self.connection.commit()
+                return False
+
+        if subtitles is None:
+            subtitles = load_srt_cached(srt_path)
+        with self.lock, self.connection:
+            # Looked up again: another thread may have indexed the file while it was parsed
+            row = self.connection.execute("SELECT id FROM files WHERE srt_path = ?", (srt_path,)).fetchone()
+            if row:
+                self._delete_file(row[0])
+            file_id = self.connection.execute(
+                "INSERT INTO files (srt_path, video_path, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                (srt_path, video_path, st.st_size, st.st_mtime_ns)
+            ).lastrowid
+            self.connection.executemany(
+                "INSERT INTO cues (file_id, start, end, content) VALUES (?, ?, ?, ?)",
+                ((file_id, cue.start, cue.end, cue.content) for cue in subtitles)
+            )
+            self.connection.execute(
+                "INSERT INTO cues_fts (rowid, content) SELECT id, content FROM cues WHERE file_id = ?", (file_id,)
+            )
+        logging.info(f"Indexed {len(subtitles)} cues from {srt_path}")
+        return True
+
+    def prune(self):
+        """
+        Drop files that no longer exist. Returns how many were dropped.
+        """
+        with self.lock, self.connection:
+            rows = self.connection.execute("SELECT id, srt_path FROM files").fetchall()
+            missing = [file_id for file_id, srt_path in rows if not os.path.exists(srt_path)]
+            for file_id in missing:
+                self._delete_file(file_id)
+        return len(missing)
+
+    def search(self, text, limit=SEARCH_LIMIT, candidates=SEARCH_CANDIDATES):
+        """
+        Cues containing text as a phrase (case and accent insensitive). The first
+        `candidates` matches are ranked and the best `limit` of them returned.
+
+        Returns:
+            list: SearchHit tuples
+        """
+        if not text.strip():
+            return []
+        with self.read_lock:
+            rows = self.read_connection.execute(
+                "SELECT files.video_path, files.srt_path, cues.start, cues.end, cues.content "
+                "FROM (SELECT rowid, rank FROM cues_fts WHERE cues_fts MATCH ? LIMIT ?) AS hits "
+                "JOIN cues ON cues.id = hits.rowid JOIN files ON files.id = cues.file_id "
+                "ORDER BY hits.rank LIMIT ?",
+                (fts_phrase(text), max(candidates, limit), limit)
+            ).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+    def close(self):
+        with self.read_lock:
+            self.read_connection.close()
+        with self.lock:
+            self.connection.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Index SRT files for full-text search, or search the index.")
+    parser.add_argument("paths", nargs="*", help="SRT files, directories or glob patterns to index")
+    parser.add_argument("-s", "--search", help="Print the cues containing this phrase")
+    parser.add_argument("--index", default=SUBTITLE_INDEX_FILE, help="Index database file")
+    args = parser.parse_args()
+
+    index = SubtitleIndex(args.index)
+    if args.paths:
+        srt_files = collect_srt_files(args.paths)
+        indexed = 0
+        for srt_file in srt_files:
+            try:
+                indexed += index.add_file(srt_file)
+            except Exception as e:
+                logging.error(f"Error indexing {srt_file}: {e}")
+        logging.info(f"{indexed} of {len(srt_files)} file(s) (re-)indexed, {index.prune()} removed.")
+    if args.search:
+        for hit in index.search(args.search):
+            minutes, seconds = divmod(int(hit.start), 60)
+            print(f"{hit.video_path or hit.srt_path}\t{minutes // 60:02}:{minutes % 60:02}:{seconds:02}\t{hit.content}")
+    index.close()
+    sys.exit(0)
@@ -0,0 +1,445 @@
+import os
+import re
+import struct
+import locale
+import hashlib
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from itertools import accumulate
+
+Cue = namedtuple('Cue', ['start', 'end', 'content'])
+
+# "00:01:02,345 --> 00:01:04,000"; also accepts '.' for milliseconds, 1-digit
+# fields and trailing position info. Anchored and linear, so it cannot backtrack badly.
+TIMING_PATTERN = re.compile(
+    r'\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})'
+)
+
+# Tried in order after UTF-8 when a file has no BOM
+FALLBACK_ENCODINGS = (locale.getpreferredencoding(False), 'cp1252')
+
+# Pre-parsed cues, keyed by SRT path, size and mtime, evicted least recently used first
+CUE_CACHE_DIR = "subtitle_cache"
+CUE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+CUE_CACHE_MAGIC = b'CUE1'
+CUE_CACHE_HEADER = struct.Struct('<4sII')  # magic, cue count, text blob size
+# Files sharing the cache directory and its size limit (alignments are stored there too)
+CUE_CACHE_EXTENSIONS = (".cues", ".align")
+
+
+class CueIndex:
+    """
+    Subtitle cues sorted by start time and stored in parallel arrays, so the cue
+    active at a playback time can be found with a binary search instead of a scan.
+    """
+
+    def __init__(self, cues=()):
+        """
+        Args:
+            cues: Iterable of (start, end, content) with times in seconds, in any order
+        """
+        cues = sorted(cues, key=lambda cue: cue[0])
+        self._set_arrays(array('d', (cue[0] for cue in cues)),
+                         array('d', (cue[1] for cue in cues)),
+                         [cue[2] for cue in cues])
+
+    @classmethod
+    def from_arrays(cls, starts, ends, contents):
+        """
+        Build an index from parallel arrays (as produced by the parser) without
+        copying them. They are only sorted if some cue starts before its predecessor.
+        """
+        if any(starts[i] > starts[i + 1] for i in range(len(starts) - 1)):
+            return cls(zip(starts, ends, contents))
+        index = cls.__new__(cls)
+        index._set_arrays(starts, ends, contents)
+        return index
+
+    def _set_arrays(self, starts, ends, contents):
+        self.starts = starts
+        self.ends = ends
+        self.contents = contents
+
+        # max_ends[i] is the latest end among cues 0..i. It never decreases, so the
+        # first cue still running at time t can be bisected even when cues overlap.
+        self.max_ends = array('d', accumulate(ends, max))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        return Cue(self.starts[index], self.ends[index], self.contents[index])
+
+    def __iter__(self):
+        return map(Cue, self.starts, self.ends, self.contents)
+
+    def find(self, time_sec, hint=-1):
+        """
+        Return the index of the cue shown at time_sec, or -1 if none is.
+        With overlapping cues the one that started first wins.
+
+        Args:
+            time_sec (float): Playback time in seconds
+            hint (int): Previously active index. During normal playback the answer is
+                that cue or the one after it, which is checked before bisecting.
+        """
+        count = len(self.starts)
+        if 0 <= hint < count and self.starts[hint] <= time_sec:
+            earlier_done = hint == 0 or self.max_ends[hint - 1] < time_sec
+            if earlier_done and time_sec <= self.ends[hint]:
+                return hint
+            following = hint + 1
+            if earlier_done and self.max_ends[hint] < time_sec:
+                if following >= count or time_sec < self.starts[following]:
+                    return -1  # In the gap after the hinted cue
+                if time_sec <= self.ends[following]:
+                    return following
+
+        index = bisect_left(self.max_ends, time_sec)
+        if index < count and self.starts[index] <= time_sec:
+            return index
+        return -1
+
+    def next_start_after(self, time_sec):
+        """
+        Return the index of the first cue starting strictly after time_sec, or -1.
+        """
+        index = bisect_right(self.starts, time_sec)
+        return index if index < len(self.starts) else -1
+
+    def next_boundary(self, time_sec, active=-1):
+        """
+        Return the earliest time after time_sec at which find() may return something
+        other than `active` (the end of the active cue or the next start), or inf.
+        """
+        index = self.next_start_after(time_sec)
+        boundary = self.starts[index] if index >= 0 else float('inf')
+        if active >= 0:
+            boundary = min(boundary, self.ends[active])
+        return boundary
+
+
+def parse_time(time_str):
+    """
+    Convert "HH:MM:SS,mmm" (or with '.') to seconds.
+    """
+    h, m, s = time_str.strip().split(':')
+    return int(h) * 3600 + int(m) * 60 + float(s.replace(',', '.'))
+
+
+def format_time(seconds):
+    """
+    Convert seconds to "HH:MM:SS,mmm".
+    """
+    millis = max(0, int(round(seconds * 1000)))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
+
+
+def parse_srt_lines(lines):
+    """
+    Parse SRT cues from an iterable of text lines (e.g. an open file) into a CueIndex.
+    Handles CRLF line endings, a leading BOM, missing cue numbers, missing blank
+    lines between cues and blocks without a valid timing line, which are skipped.
+    """
+    starts, ends, contents = array('d'), array('d'), []
+    match_timing = TIMING_PATTERN.match
+    timing = None
+    text = []
+
+    def flush():
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = timing.groups()
+        starts.append(int(h1) * 3600 + int(m1) * 60 + int(s1) + int(ms1.ljust(3, '0')) / 1000)
+        ends.append(int(h2) * 3600 + int(m2) * 60 + int(s2) + int(ms2.ljust(3, '0')) / 1000)
+        contents.append("\n".join(text).strip())
+
+    for line in lines:
+        line = line.rstrip('\r\n').lstrip('\ufeff')
+        if timing is None:
+            # Between cues: skip cue numbers and junk until the next timing line
+            timing = match_timing(line)
+            continue
+        if not line.strip():
+            flush()
+            timing, text = None, []
+            continue
+        next_timing = match_timing(line)
+        if next_timing:
+            # The blank line before this cue is missing; drop its number from our text
+            if text and text[-1].strip().isdigit():
+                text.pop()
+            flush()
+            timing, text = next_timing, []
+        else:
+            text.append(line)
+
+    if timing is not None:
+        flush()
+    return CueIndex.from_arrays(starts, ends, contents)
+
+
+def parse_srt(content):
+    """
+    Parse SRT text already in memory.
+    """
+    return parse_srt_lines(content.splitlines())
+
+
+def decode_subtitle_bytes(data, encoding=None):
+    """
+    Decode a subtitle file: by its BOM if present, else as UTF-8 if it is valid
+    UTF-8, else with the first legacy codepage that accepts it.
+    Returns (text, encoding used).
+    """
+    if encoding:
+        return data.decode(encoding, errors='replace'), encoding
+    if data.startswith(b'\xef\xbb\xbf'):
+        return data.decode('utf-8-sig', errors='replace'), 'utf-8-sig'
+    if data.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return data.decode('utf-16', errors='replace'), 'utf-16'
+    for candidate in ('utf-8',) + FALLBACK_ENCODINGS:
+        try:
+            return data.decode(candidate), candidate
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return data.decode('latin-1'), 'latin-1'  # Decodes any byte sequence
+
+
+def load_srt(file_path, encoding=None):
+    """
+    Read and parse an SRT file.
+
+    Args:
+        file_path (str): Path to the SRT file
+        encoding (str): Force an encoding instead of detecting it
+    """
+    with open(file_path, 'rb') as f:
+        text, encoding = decode_subtitle_bytes(f.read(), encoding)
+    subtitles = parse_srt_lines(text.splitlines())
+    logging.debug(f"Parsed {len(subtitles)} cues from {file_path} ({encoding})")
+    return subtitles
+
+
+def write_srt(subtitles, file_path):
+    """
+    Write cues (a CueIndex or (start, end, content) tuples) as a UTF-8 SRT file.
+    """
+    tmp_file = file_path + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8', newline='\n') as f:
+        for number, (start, end, content) in enumerate(subtitles, 1):
+            f.write(f"{number}\n{format_time(start)} --> {format_time(end)}\n{content}\n\n")
+    os.replace(tmp_file, file_path)
+
+
+def cue_cache_path(file_path, cache_dir=CUE_CACHE_DIR):
+    """
+    Cache file for an SRT; any change of path, size or mtime gives a new key.
+    """
+    st = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".cues")
+
+
+def write_cue_cache(subtitles, cache_file):
+    """
+    Store a CueIndex as raw start/end/max-end columns followed by the cue texts
+    joined with NUL, so reading it back is a few memory copies instead of an SRT parse.
+    """
+    blob = "\0".join(content.replace("\0", "") for content in subtitles.contents).encode('utf-8')
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(CUE_CACHE_HEADER.pack(CUE_CACHE_MAGIC, len(subtitles), len(blob)))
+        f.write(subtitles.starts.tobytes())
+        f.write(subtitles.ends.tobytes())
+        f.write(subtitles.max_ends.tobytes())
+        f.write(blob)
+    os.replace(tmp_file, cache_file)
+
+
+def read_cue_cache(cache_file):
+    """
+    Read a cache file in one go and rebuild the CueIndex: the columns are copied
+    into arrays as they are and the texts decoded in a single pass.
+    """
+    with open(cache_file, 'rb') as f:
+        data = memoryview(f.read())
+    if len(data) < CUE_CACHE_HEADER.size:
+        raise ValueError(f"Corrupt cue cache file: {cache_file}")
+    magic, count, blob_size = CUE_CACHE_HEADER.unpack_from(data)
+    if magic != CUE_CACHE_MAGIC:
+        raise ValueError(f"Not a cue cache file: {cache_file}")
+    offset = CUE_CACHE_HEADER.size
+    if len(data) != offset + 3 * 8 * count + blob_size:
+        raise ValueError(f"Corrupt cue cache file: {cache_file}")
+    columns = []
+    for _ in range(3):
+        column = array('d')
+        column.frombytes(data[offset:offset + 8 * count])
+        columns.append(column)
+        offset += 8 * count
+    blob = str(data[offset:], 'utf-8')
+    contents = blob.split("\0") if count else []
+    if len(contents) != count:
+        raise ValueError(f"Corrupt cue cache file: {cache_file}")
+
+    index = CueIndex.__new__(CueIndex)
+    index.starts, index.ends, index.max_ends = columns
+    index.contents = contents
+    return index
+
+
+def evict_cue_cache(cache_dir=CUE_CACHE_DIR, max_bytes=CUE_CACHE_MAX_BYTES):
+    """
+    Delete the least recently used cache files until the directory fits in max_bytes.
+    """
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(CUE_CACHE_EXTENSIONS):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError as e:
+            logging.error(f"Error evicting cue cache file {path}: {e}")
+
+
+def load_srt_cached(file_path, cache_dir=CUE_CACHE_DIR, max_bytes=CUE_CACHE_MAX_BYTES):
+    """
+    Like load_srt, but reuses the cues parsed the last time this exact file was opened.
+    Hits refresh the file's mtime, which is the recency used for eviction.
+    """
+    cache_file = None
+    try:
+        cache_file = cue_cache_path(file_path, cache_dir)
+        if os.path.exists(cache_file):
+            subtitles = read_cue_cache(cache_file)
+            os.utime(cache_file)
+            logging.debug(f"Loaded {len(subtitles)} cached cues for {file_path}")
+            return subtitles
+    except Exception as e:
+        logging.error(f"Error reading cue cache for {file_path}: {e}")
+        # A damaged entry is dropped and rewritten below
+        if cache_file:
+            try:
+                os.remove(cache_file)
+            except OSError:
+                cache_file = None
+
+    subtitles = load_srt(file_path)
+    if cache_file:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            write_cue_cache(subtitles, cache_file)
+            evict_cue_cache(cache_dir, max_bytes)
+        except Exception as e:
+            logging.error(f"Error writing cue cache for {file_path}: {e}")
+    return subtitles
+
+
+class SubtitlePane:
+    """
+    Shows a sliding window of cues around the active one in a Tk Text widget.
+    The displayed window is remembered, so a tick with the same active cue does
+    no Tk work and a moving window only touches the cues entering or leaving it.
+    """
+
+    TAG = "underline"
+
+    def __init__(self, text_widget, before=3, after=2):
+        """
+        Args:
+            text_widget: Tk Text widget (or anything with the same methods)
+            before (int): Number of previous cues kept above the active one
+            after (int): Number of upcoming cues shown below it
+        """
+        self.text_widget = text_widget
+        self.before = before
+        self.after = after
+        self.text_widget.tag_configure(self.TAG, underline=True)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the displayed window, e.g. after the widget content was replaced elsewhere.
+        The next render rebuilds the pane.
+        """
+        self.subtitles = None
+        self.first = self.last = self.active = -1
+        self.line_counts = []
+
+    def render(self, subtitles, active):
+        """
+        Display the window around cue `active` of a CueIndex. Returns False if nothing changed.
+        """
+        if active < 0:
+            return False
+        first = max(0, active - self.before)
+        last = min(len(subtitles) - 1, active + self.after)
+        if subtitles is self.subtitles and (first, last, active) == (self.first, self.last, self.active):
+            return False
+
+        widget = self.text_widget
+        widget.config(state="normal")  # Enable editing
+        if subtitles is not self.subtitles or first > self.last or last < self.first:
+            self._rebuild(subtitles, first, last)
+        else:
+            self._slide(subtitles, first, last)
+        self.subtitles = subtitles
+        self.first, self.last = first, last
+
+        if active != self.active:
+            self.active = active
+            line = 1 + sum(self.line_counts[:active - first])
+            start, end = f"{line}.0", f"{line + self.line_counts[active - first] - 2}.end"
+            widget.tag_remove(self.TAG, "1.0", "end")
+            widget.tag_add(self.TAG, start, end)
+            widget.see(start)  # Ensure the current subtitle is visible
+        widget.config(state="disabled")  # Disable editing
+        return True
+
+    @staticmethod
+    def _block(content):
+        # Each cue is followed by a blank line; a block spans its text lines plus that one
+        return content + "\n\n", content.count("\n") + 2
+
+    def _rebuild(self, subtitles, first, last):
+        blocks = [self._block(subtitles.contents[i]) for i in range(first, last + 1)]
+        self.text_widget.delete("1.0", "end")
+        self.text_widget.insert("end", "".join(text for text, _ in blocks))
+        self.line_counts = [lines for _, lines in blocks]
+        self.active = -1
+
+    def _slide(self, subtitles, first, last):
+        widget = self.text_widget
+        # Drop cues that scrolled out at the top
+        if first > self.first:
+            dropped = self.line_counts[:first - self.first]
+            widget.delete("1.0", f"{1 + sum(dropped)}.0")
+            del self.line_counts[:first - self.first]
+        # Drop cues beyond the new bottom edge (e.g. after seeking back a little)
+        if last < self.last:
+            keep = last - max(first, self.first) + 1
+            widget.delete(f"{1 + sum(self.line_counts[:keep])}.0", "end")
+            del self.line_counts[keep:]
+        # Add cues entering at the top
+        if first < self.first:
+            blocks = [self._block(subtitles.contents[i]) for i in range(first, self.first)]
+            widget.insert("1.0", "".join(text for text, _ in blocks))
+            self.line_counts[:0] = [lines for _, lines in blocks]
+        # Add cues entering at the bottom
+        if last > self.last:
+            blocks = [self._block(subtitles.contents[i]) for i in range(self.last + 1, last + 1)]
+            widget.insert("end", "".join(text for text, _ in blocks))
+            self.line_counts.extend(lines for _, lines in blocks)
+        # Keep line offsets of the active cue valid after edits above it
+        self.active = -1
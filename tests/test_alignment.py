@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from alignment import (TimeMap, align_subtitles, align_subtitles_cached, estimate_offset,
+                       fit_time_map, match_cues, overlap)
+from subtitles import CueIndex, write_srt
+
+
+def make_cues(count, seed=0):
+    """
+    Cues of 1-4 s with gaps of 0.2-2 s, as (start, end, content).
+    """
+    rng = random.Random(seed)
+    cues, start = [], 1.0
+    for number in range(count):
+        end = start + rng.uniform(1.0, 4.0)
+        cues.append((start, end, f"line {number}"))
+        start = end + rng.uniform(0.2, 2.0)
+    return cues
+
+
+def retimed(cues, scale=1.0, offset=0.0):
+    return CueIndex((start * scale + offset, end * scale + offset, content) for start, end, content in cues)
+
+
+def test_overlap():
+    assert overlap(0, 2, 1, 3) == pytest.approx(1 / 3)
+    assert overlap(0, 2, 0, 2) == 1.0
+    assert overlap(0, 1, 1, 2) == 0.0
+    assert overlap(0, 1, 5, 6) == 0.0
+
+
+def test_time_map_interpolates_between_knots_and_extends_outside():
+    time_map = TimeMap([10.0, 20.0, 30.0], [1.0, 3.0, 3.0])
+    assert time_map.offset(15.0) == pytest.approx(2.0)
+    assert time_map(15.0) == pytest.approx(17.0)
+    assert time_map.offset(0.0) == pytest.approx(-1.0)
+    assert time_map.offset(100.0) == pytest.approx(3.0)
+    assert TimeMap([10.0], [2.5]).offset(100.0) == 2.5
+
+
+def test_estimate_offset_finds_constant_shift():
+    cues = make_cues(200)
+    offset, score = estimate_offset(retimed(cues), retimed(cues, offset=3.7))
+    assert offset == pytest.approx(3.7, abs=0.11)
+    assert score >= 150
+
+
+def test_match_cues_pairs_shifted_tracks_monotonically():
+    cues = make_cues(100)
+    left = retimed(cues)
+    right_cues = [cue for number, cue in enumerate(cues) if number % 10 != 5]  # Some lines missing
+    right = retimed(right_cues, offset=1.5)
+    pairs = match_cues(left, right, TimeMap([0.0], [1.5]))
+    # Every right cue is matched to the left cue it was made from, in order
+    assert [(left.contents[i], right.contents[j]) for i, j in pairs] == [(c, c) for _, _, c in right_cues]
+
+
+def test_match_cues_rejects_cues_without_overlap():
+    left = retimed(make_cues(20))
+    right = retimed(make_cues(20), offset=500.0)
+    assert match_cues(left, right, TimeMap([0.0], [0.0])) == []
+
+
+def test_fit_time_map_follows_drift():
+    cues = make_cues(300)
+    left = retimed(cues)
+    right = retimed(cues, scale=1.001, offset=2.0)  # Offset grows from 2.0 s by 1 ms per second
+    time_map = fit_time_map(left, right, [(i, i) for i in range(len(cues))])
+    for time_sec in (left.starts[30], left.starts[150], left.starts[270]):
+        assert time_map.offset(time_sec) == pytest.approx(2.0 + 0.001 * time_sec, abs=0.05)
+
+
+def test_fit_time_map_ignores_a_few_wrong_matches():
+    cues = make_cues(100)
+    left, right = retimed(cues), retimed(cues, offset=2.0)
+    pairs = [(i, i) for i in range(len(cues))]
+    pairs[10] = (10, 40)
+    pairs[60] = (60, 20)
+    time_map = fit_time_map(left, right, pairs)
+    assert all(offset == pytest.approx(2.0) for offset in time_map.offsets)
+
+
+@pytest.mark.parametrize("scale, offset", [(1.0, 3.7), (25 / 23.976, -8.2), (1.0, -60.0)])
+def test_align_subtitles_maps_every_cue(scale, offset):
+    cues = make_cues(400)
+    alignment = align_subtitles(retimed(cues), retimed(cues, scale, offset))
+    assert alignment is not None
+    assert list(alignment.mapping) == list(range(len(cues)))
+    assert alignment.time_map(100.0) == pytest.approx(100.0 * scale + offset, abs=0.2)
+
+
+def test_align_subtitles_gives_up_on_unrelated_tracks():
+    assert align_subtitles(retimed(make_cues(200, seed=1)), retimed(make_cues(200, seed=2), offset=5000.0)) is None
+    assert align_subtitles(CueIndex(), retimed(make_cues(10))) is None
+
+
+def test_align_subtitles_cached_reuses_result(tmp_path):
+    cues = make_cues(100)
+    left_path, right_path = str(tmp_path / "left.srt"), str(tmp_path / "right.srt")
+    write_srt(retimed(cues), left_path)
+    write_srt(retimed(cues, offset=2.0), right_path)
+    cache_dir = str(tmp_path / "cache")
+    left, right = retimed(cues), retimed(cues, offset=2.0)
+    first = align_subtitles_cached(left_path, right_path, left, right, cache_dir)
+    second = align_subtitles_cached(left_path, right_path, left, right, cache_dir)
+    assert list(second.mapping) == list(first.mapping)
+    assert len(list((tmp_path / "cache").glob("*.align"))) == 1
@@ -0,0 +1,348 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import explanations
+from explanations import DEFAULT_MODEL, ExplanationCache, ExplanationWorker, build_messages
+
+TIMEOUT = 5
+
+
+class StubStream:
+    """
+    Streamed completion yielding the answer word by word; after the first chunk
+    it waits for `gate` (if given).
+    """
+
+    def __init__(self, answer, gate=None):
+        self.pieces = [word + " " for word in answer.split()]
+        self.gate = gate
+        self.closed = False
+
+    def __iter__(self):
+        for number, piece in enumerate(self.pieces):
+            if number == 1 and self.gate:
+                self.gate.wait(TIMEOUT)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    def close(self):
+        self.closed = True
+
+
+class StubCompletions:
+    """
+    Stands in for client.chat.completions. Answers "explanation of <text>";
+    with hold=True every call waits until release is set. Streams pause after
+    their first chunk until stream_gate is set.
+    """
+
+    def __init__(self, hold=False, fail=False, stream_gate=None):
+        self.calls = []
+        self.streams = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+        self.fail = fail
+        self.stream_gate = stream_gate
+
+    def create(self, model, messages, stream=False, **options):
+        text = messages[-1]['content'].split('"')[1]
+        self.calls.append(text)
+        self.started.set()
+        self.release.wait(TIMEOUT)
+        if self.fail:
+            raise RuntimeError("API down")
+        answer = f"explanation of {text}"
+        if stream:
+            self.streams.append(StubStream(answer, self.stream_gate))
+            return self.streams[-1]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))])
+
+
+def stub_client(completions):
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+
+class Results:
+    """
+    on_result callback collecting what the worker delivers.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.partial = threading.Event()
+        self.finished = threading.Event()
+
+    def __call__(self, result):
+        self.items.append(result)
+        if result['partial']:
+            self.partial.set()
+        else:
+            self.finished.set()
+
+    def final(self):
+        assert self.finished.wait(TIMEOUT), "no result delivered"
+        return [result for result in self.items if not result['partial']]
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """
+    OpenAI-compatible chat completions endpoint answering "explanation of <text>",
+    or failing with server.status when that is not 200. Streamed answers are sent
+    as server-sent events, one word per chunk; after the first chunk the stream
+    waits for server.stream_gate (if set).
+    """
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append({'path': self.path, 'authorization': self.headers.get('Authorization'),
+                                     'body': body})
+        if self.server.status != 200:
+            self.send_json(self.server.status, {'error': {'message': "stub says no", 'type': "invalid_request_error",
+                                                          'code': None, 'param': None}})
+            return
+        text = body['messages'][-1]['content'].split('"')[1]
+        answer = f"explanation of {text}"
+        if body.get('stream'):
+            self.send_stream(body['model'], [word + " " for word in answer.split()])
+            return
+        self.send_json(200, {
+            'id': "chatcmpl-stub", 'object': "chat.completion", 'created': 0, 'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': "stop",
+                         'message': {'role': "assistant", 'content': answer}}],
+        })
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', "application/json")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, model, pieces):
+        self.send_response(200)
+        self.send_header('Content-Type', "text/event-stream")
+        self.send_header('Cache-Control', "no-cache")
+        self.end_headers()  # No length: the stream ends when the connection closes
+        deltas = [{'role': "assistant", 'content': ""}] + [{'content': piece} for piece in pieces] + [{}]
+        for number, delta in enumerate(deltas):
+            if number == 2 and self.server.stream_gate:
+                self.server.stream_gate.wait(TIMEOUT)
+            chunk = {'id': "chatcmpl-stub", 'object': "chat.completion.chunk", 'created': 0, 'model': model,
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': None if delta else "stop"}]}
+            self.send_event(json.dumps(chunk))
+        self.send_event("[DONE]")
+
+    def send_event(self, data):
+        try:
+            self.wfile.write(f"data: {data}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        except OSError:
+            pass  # The client closed the stream
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def api_server():
+    """
+    Stub API on 127.0.0.1; point the worker's base_url at server.base_url.
+    """
+    pytest.importorskip("openai")
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubApiHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.status = 200
+    server.stream_gate = None
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def http_worker(server, results, **options):
+    return ExplanationWorker(results, base_url=server.base_url, api_key="test-key", timeout=TIMEOUT, **options)
+
+
+def test_worker_delivers_explanation():
+    results = Results()
+    worker = ExplanationWorker(results, client=stub_client(StubCompletions()))
+    request_id = worker.submit("serendipity")
+    try:
+        [result] = results.final()
+    finally:
+        worker.stop()
+    assert result['id'] == request_id
+    assert result['explanation'] == "explanation of serendipity"
+    assert result['error'] is None
+
+
+def test_worker_reports_errors():
+    results = Results()
+    worker = ExplanationWorker(results, client=stub_client(StubCompletions(fail=True)))
+    worker.submit("serendipity")
+    try:
+        [result] = results.final()
+    finally:
+        worker.stop()
+    assert result['explanation'] is None
+    assert "API down" in result['error']
+
+
+def test_newer_request_supersedes_one_in_flight():
+    completions = StubCompletions(hold=True)
+    results = Results()
+    worker = ExplanationWorker(results, client=stub_client(completions))
+    worker.submit("first")
+    assert completions.started.wait(TIMEOUT)
+    second_id = worker.submit("second")
+    completions.release.set()
+    try:
+        [result] = results.final()
+    finally:
+        worker.stop()
+    assert result['id'] == second_id
+    assert result['explanation'] == "explanation of second"
+
+
+def test_cancel_drops_answer_in_flight():
+    completions = StubCompletions(hold=True)
+    results = Results()
+    worker = ExplanationWorker(results, client=stub_client(completions))
+    worker.submit("first")
+    assert completions.started.wait(TIMEOUT)
+    worker.cancel()
+    completions.release.set()
+    worker.submit("second")
+    try:
+        assert [result['text'] for result in results.final()] == ["second"]
+    finally:
+        worker.stop()
+
+
+def test_cached_answer_skips_model(tmp_path):
+    completions = StubCompletions()
+    cache = ExplanationCache(str(tmp_path / "cache.db"))
+    cache.put("Serendipity", "English", DEFAULT_MODEL, "cached answer")
+    worker = ExplanationWorker(Results(), client=stub_client(completions), cache=cache)
+    try:
+        assert worker.cached("serendipity!") == "cached answer"
+        assert worker.explain("serendipity") == "cached answer"
+        assert worker.explain("other") == "explanation of other"
+        assert completions.calls == ["other"]
+        assert worker.cached("other") == "explanation of other"
+    finally:
+        cache.close()
+
+
+def test_streaming_delivers_growing_partials_then_final(tmp_path, monkeypatch):
+    monkeypatch.setattr(explanations, 'STREAM_UPDATE_SECONDS', 0)
+    cache = ExplanationCache(str(tmp_path / "cache.db"))
+    results = Results()
+    worker = ExplanationWorker(results, client=stub_client(StubCompletions()), cache=cache, stream=True)
+    worker.submit("serendipity")
+    try:
+        [result] = results.final()
+    finally:
+        worker.stop()
+    partials = [item['explanation'] for item in results.items if item['partial']]
+    assert partials == ["explanation ", "explanation of ", "explanation of serendipity "]
+    assert result['explanation'] == "explanation of serendipity "
+    assert cache.get("serendipity", "English", DEFAULT_MODEL) == result['explanation']
+    cache.close()
+
+
+def test_stale_stream_is_closed(monkeypatch):
+    monkeypatch.setattr(explanations, 'STREAM_UPDATE_SECONDS', 0)
+    gate = threading.Event()
+    completions = StubCompletions(stream_gate=gate)
+    results = Results()
+    worker = ExplanationWorker(results, client=stub_client(completions), stream=True)
+    worker.submit("first")
+    assert results.partial.wait(TIMEOUT)
+    second_id = worker.submit("second")
+    gate.set()
+    try:
+        [result] = results.final()
+    finally:
+        worker.stop()
+    assert result['id'] == second_id
+    assert completions.streams[0].closed
+    # The stale answer got no further than its first chunk
+    assert [item['explanation'] for item in results.items if item['text'] == "first"] == ["explanation "]
+
+
+def test_worker_talks_to_openai_compatible_server(api_server):
+    results = Results()
+    worker = http_worker(api_server, results)
+    worker.submit("serendipity", "German")
+    try:
+        [result] = results.final()
+    finally:
+        worker.stop()
+    assert result['explanation'] == "explanation of serendipity"
+    assert result['error'] is None
+    [request] = api_server.requests
+    assert request['path'] == "/v1/chat/completions"
+    assert request['authorization'] == "Bearer test-key"
+    assert request['body']['model'] == DEFAULT_MODEL
+    assert request['body']['messages'] == build_messages("serendipity", "German")
+    assert not request['body'].get('stream')
+
+
+@pytest.mark.parametrize('status', [400, 401, 404])
+def test_worker_reports_http_errors(api_server, status):
+    api_server.status = status
+    results = Results()
+    worker = http_worker(api_server, results)
+    worker.submit("serendipity")
+    try:
+        [result] = results.final()
+    finally:
+        worker.stop()
+    assert result['explanation'] is None
+    assert str(status) in result['error']
+    assert "stub says no" in result['error']
+    assert len(api_server.requests) == 1  # Client errors are not retried
+
+
+def test_streaming_from_server_sent_events(api_server, monkeypatch):
+    monkeypatch.setattr(explanations, 'STREAM_UPDATE_SECONDS', 0)
+    results = Results()
+    worker = http_worker(api_server, results, stream=True)
+    worker.submit("serendipity")
+    try:
+        [result] = results.final()
+    finally:
+        worker.stop()
+    assert api_server.requests[0]['body']['stream'] is True
+    partials = [item['explanation'] for item in results.items if item['partial']]
+    assert partials == ["explanation ", "explanation of ", "explanation of serendipity "]
+    assert result['explanation'] == "explanation of serendipity "
+
+
+def test_stale_server_stream_is_abandoned(api_server, monkeypatch):
+    monkeypatch.setattr(explanations, 'STREAM_UPDATE_SECONDS', 0)
+    api_server.stream_gate = threading.Event()
+    results = Results()
+    worker = http_worker(api_server, results, stream=True)
+    worker.submit("first")
+    assert results.partial.wait(TIMEOUT)
+    second_id = worker.submit("second")
+    api_server.stream_gate.set()
+    try:
+        [result] = results.final()
+    finally:
+        worker.stop()
+    assert result['id'] == second_id
+    assert result['explanation'] == "explanation of second "
+    # The stale answer got no further than its first word
+    assert [item['explanation'] for item in results.items if item['text'] == "first"] == ["explanation "]
@@ -0,0 +1,143 @@
+import io
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import resync
+from subtitles import CueIndex
+
+
+def make_subtitles(count=1500, seed=0):
+    """
+    Cues of 1-4 s with gaps of 0.2-2 s.
+    """
+    rng = random.Random(seed)
+    cues, start = [], 1.0
+    for number in range(count):
+        end = start + rng.uniform(1.0, 4.0)
+        cues.append((start, end, f"line {number}"))
+        start = end + rng.uniform(0.2, 2.0)
+    return CueIndex(cues)
+
+
+def noisy_speech(subtitles, scale, offset, flip=0.15):
+    """
+    Speech timeline matching the cues retimed by scale and offset, with a share
+    of frames flipped to stand in for music, silence in dialogue and VAD errors.
+    """
+    length = int((subtitles.ends[-1] * scale + offset + 60) / resync.FRAME_SECONDS)
+    speech = resync.cue_activity(resync.apply_sync(subtitles, scale, offset), length)
+    flipped = np.random.default_rng(0).random(length) < flip
+    return np.where(flipped, 1 - speech, speech).astype(np.float32)
+
+
+@pytest.mark.parametrize("lag", [37, -250, 0])
+def test_cross_correlate_finds_lag(lag):
+    cues = (np.random.default_rng(1).random(20000) < 0.4).astype(np.float32)
+    speech = np.roll(cues, lag)
+    found, score = resync.cross_correlate(speech, cues, 1000)
+    assert found == lag
+    assert score > 0.9
+
+
+def test_cross_correlate_respects_max_lag():
+    cues = (np.random.default_rng(1).random(20000) < 0.4).astype(np.float32)
+    found, _ = resync.cross_correlate(np.roll(cues, 500), cues, 100)
+    assert abs(found) <= 100
+
+
+def test_cue_activity_marks_shown_frames():
+    activity = resync.cue_activity(CueIndex([(1.0, 2.0, "a"), (1.5, 3.0, "b"), (9.0, 20.0, "c")]), 1000)
+    assert activity[:100].sum() == 0
+    assert activity[100:300].all()
+    assert activity[300:900].sum() == 0
+    assert activity[900:].all()  # Clipped to the timeline
+    assert len(activity) == 1000
+
+
+def test_window_zero_pads_outside():
+    values = np.arange(1, 6, dtype=np.float32)
+    assert list(resync.window(values, -2, 4)) == [0, 0, 1, 2]
+    assert list(resync.window(values, 3, 4)) == [4, 5, 0, 0]
+
+
+@pytest.mark.parametrize("scale, offset", [(1.0, 3.7), (25 / 23.976, -8.2), (23.976 / 25, 45.0)])
+def test_find_sync_recovers_offset_and_frame_rate(scale, offset):
+    subtitles = make_subtitles()
+    sync = resync.find_sync(noisy_speech(subtitles, scale, offset), subtitles)
+    assert sync['scale'] == pytest.approx(scale, rel=1e-4)
+    assert sync['offset'] == pytest.approx(offset, abs=0.05)
+
+
+def test_find_sync_measures_drift():
+    subtitles = make_subtitles()
+    sync = resync.find_sync(noisy_speech(subtitles, 1.0004, 2.0), subtitles)
+    assert sync['segments'] >= 3
+    assert sync['scale'] == pytest.approx(1.0004, abs=2e-5)
+    assert sync['offset'] == pytest.approx(2.0, abs=0.1)
+
+
+def test_apply_sync_clamps_at_zero():
+    synced = resync.apply_sync(CueIndex([(1.0, 2.0, "a"), (10.0, 12.0, "b")]), 2.0, -3.0)
+    assert list(synced) == [(0.0, 1.0, "a"), (17.0, 21.0, "b")]
+
+
+class ShortReads(io.BytesIO):
+    """
+    Pipe that returns at most `size` bytes per read.
+    """
+
+    def __init__(self, data, size):
+        super().__init__(data)
+        self.size = size
+
+    def read(self, size=-1):
+        return super().read(self.size if size < 0 else min(size, self.size))
+
+
+class FakeFfmpeg:
+    """
+    Popen stand-in whose stdout is the given PCM bytes, read at most read_size at a time.
+    """
+
+    def __init__(self, pcm, read_size=None):
+        self.pcm = pcm
+        self.read_size = read_size
+
+    def __call__(self, command, stdout=None, stderr=None, **options):
+        self.stdout = ShortReads(self.pcm, self.read_size) if self.read_size else io.BytesIO(self.pcm)
+        return self
+
+    def wait(self):
+        return 0
+
+
+def tone_bursts(seconds=120, seed=2):
+    """
+    Faint noise with a loud 4 s tone starting every 10 s, as 16-bit PCM.
+    """
+    rate = resync.SAMPLE_RATE
+    t = np.arange(seconds * rate) / rate
+    loud = (t % 10 >= 5) & (t % 10 < 9)
+    samples = np.random.default_rng(seed).normal(0, 30, len(t)) + loud * 3000 * np.sin(2 * np.pi * 800 * t)
+    return samples.astype('<i2').tobytes(), loud[::resync.FRAME_SAMPLES]
+
+
+def test_speech_activity_marks_loud_frames(monkeypatch):
+    pcm, loud = tone_bursts()
+    monkeypatch.setattr(resync.subprocess, 'Popen', FakeFfmpeg(pcm))
+    speech = resync.speech_activity("video.mkv")
+    assert len(speech) == len(loud)
+    assert (speech == loud).mean() > 0.99
+
+
+def test_speech_activity_does_not_depend_on_read_size(monkeypatch):
+    pcm, _ = tone_bursts()
+    monkeypatch.setattr(resync.subprocess, 'Popen', FakeFfmpeg(pcm))
+    whole = resync.speech_activity("video.mkv")
+    # Reads that end inside a frame carry the remaining samples over
+    monkeypatch.setattr(resync.subprocess, 'Popen', FakeFfmpeg(pcm, read_size=1234))
+    chunked = resync.speech_activity("video.mkv")
+    assert np.array_equal(whole, chunked)
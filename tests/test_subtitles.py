@@ -0,0 +1,326 @@
+import io
+import random
+
+import pytest
+
+import subtitles as subtitles_module
+from subtitles import (CueIndex, SubtitlePane, decode_subtitle_bytes, load_srt, parse_srt, parse_srt_lines,
+                       write_srt)
+
+SRT = """1
+00:00:01,000 --> 00:00:02,500
+Hello
+world
+
+2
+00:00:03,000 --> 00:00:04,000
+Second cue
+
+"""
+
+
+def make_overlapping_cues(count, seed=0):
+    """
+    Cues of 0.5-6 s starting 0-3 s apart, so many overlap; a few run very long.
+    """
+    rng = random.Random(seed)
+    cues, start = [], 0.5
+    for number in range(count):
+        length = rng.uniform(20.0, 40.0) if number % 17 == 3 else rng.uniform(0.5, 6.0)
+        cues.append((start, start + length, f"line {number}"))
+        start += rng.choice((0.0, rng.uniform(0.0, 3.0)))
+    return cues
+
+
+def shown_at(subtitles, time_sec):
+    """
+    Reference for CueIndex.find: the earliest started cue covering time_sec, by a scan.
+    """
+    for index, (start, end, _) in enumerate(subtitles):
+        if start <= time_sec <= end:
+            return index
+    return -1
+
+
+class FakeText:
+    """
+    The part of a Tk Text widget SubtitlePane uses. Like Tk, the text always ends
+    with a newline that cannot be deleted. Edits are counted.
+    """
+
+    def __init__(self):
+        self.text = ""  # Without Tk's final newline
+        self.tag = None
+        self.edits = []
+        self.state = "normal"
+
+    def index(self, position):
+        if position == "end":
+            return len(self.text)
+        line, column = position.split(".")
+        lines = (self.text + "\n").split("\n")
+        if int(line) > len(lines):
+            return len(self.text)
+        offset = sum(len(text) + 1 for text in lines[:int(line) - 1])
+        return offset + (len(lines[int(line) - 1]) if column == "end" else int(column))
+
+    def insert(self, position, text):
+        assert self.state == "normal"
+        offset = self.index(position)
+        self.text = self.text[:offset] + text + self.text[offset:]
+        self.edits.append(('insert', text))
+
+    def delete(self, first, last):
+        assert self.state == "normal"
+        start, end = self.index(first), self.index(last)
+        self.edits.append(('delete', self.text[start:end]))
+        self.text = self.text[:start] + self.text[end:]
+
+    def tag_add(self, tag, first, last):
+        self.tag = (self.index(first), self.index(last))
+
+    def tag_remove(self, tag, first, last):
+        self.tag = None
+
+    def underlined(self):
+        return self.text[self.tag[0]:self.tag[1]] if self.tag else None
+
+    def tag_configure(self, tag, **options):
+        pass
+
+    def config(self, state):
+        self.state = state
+
+    def see(self, position):
+        pass
+
+
+def pane_text(subtitles, first, last):
+    return "".join(content + "\n\n" for content in subtitles.contents[first:last + 1])
+
+
+def multiline_cues(count, seed=0):
+    rng = random.Random(seed)
+    return CueIndex((number * 3.0, number * 3.0 + 2.0,
+                     "\n".join(f"cue {number} line {line}" for line in range(rng.randint(1, 3))))
+                    for number in range(count))
+
+
+def test_find_prefers_the_cue_that_started_first():
+    subtitles = CueIndex([(0.0, 10.0, "long"), (2.0, 3.0, "inside"), (4.0, 5.0, "also inside"),
+                          (11.0, 12.0, "after")])
+    assert subtitles.find(2.5) == 0
+    assert subtitles.find(4.5) == 0
+    assert subtitles.find(10.0) == 0  # Ends are inclusive
+    assert subtitles.find(10.5) == -1
+    assert subtitles.find(11.0) == 3
+    assert subtitles.find(-1.0) == -1
+    assert subtitles.find(13.0) == -1
+
+
+def test_find_sees_a_long_cue_behind_later_short_ones():
+    subtitles = CueIndex([(0.0, 1.0, "a"), (2.0, 20.0, "long"), (3.0, 4.0, "b"), (5.0, 6.0, "c")])
+    assert subtitles.find(0.5) == 0
+    assert subtitles.find(1.5) == -1
+    assert subtitles.find(3.5) == 1
+    assert subtitles.find(7.0) == 1
+    assert subtitles.find(7.0, hint=3) == 1
+
+
+def test_find_sorts_unordered_input():
+    subtitles = CueIndex.from_arrays([5.0, 1.0, 3.0], [6.0, 2.0, 4.0], ["c", "a", "b"])
+    assert subtitles.contents == ["a", "b", "c"]
+    assert [subtitles.find(t) for t in (1.5, 3.5, 5.5)] == [0, 1, 2]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_find_matches_a_scan_with_overlapping_cues(seed):
+    subtitles = CueIndex(make_overlapping_cues(300, seed))
+    rng = random.Random(seed)
+    times = sorted(rng.uniform(-1.0, subtitles.max_ends[-1] + 1.0) for _ in range(1000))
+    times += [cue.start for cue in subtitles] + [cue.end for cue in subtitles]
+    for time_sec in times:
+        assert subtitles.find(time_sec) == shown_at(subtitles, time_sec), time_sec
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_find_with_hints_matches_without(seed):
+    subtitles = CueIndex(make_overlapping_cues(300, seed))
+    rng = random.Random(seed)
+    # Playback: the hint is the previous answer, times move forward in small steps
+    active, time_sec = -1, 0.0
+    while time_sec < subtitles.max_ends[-1] + 1.0:
+        active = subtitles.find(time_sec, hint=active)
+        assert active == shown_at(subtitles, time_sec), time_sec
+        time_sec += rng.uniform(0.0, 0.3)
+    # Seeks: any hint, right or wrong, gives the same answer
+    for _ in range(2000):
+        time_sec = rng.uniform(0.0, subtitles.max_ends[-1])
+        hint = rng.randrange(-1, len(subtitles))
+        assert subtitles.find(time_sec, hint=hint) == subtitles.find(time_sec), (time_sec, hint)
+
+
+def test_next_start_after_is_strict_and_skips_equal_starts():
+    subtitles = CueIndex([(1.0, 2.0, "a"), (3.0, 4.0, "b"), (3.0, 5.0, "c"), (6.0, 7.0, "d")])
+    assert subtitles.next_start_after(0.0) == 0
+    assert subtitles.next_start_after(1.0) == 1
+    assert subtitles.next_start_after(2.5) == 1
+    assert subtitles.next_start_after(3.0) == 3
+    assert subtitles.next_start_after(6.0) == -1
+    assert CueIndex().next_start_after(0.0) == -1
+
+
+def test_next_boundary():
+    subtitles = CueIndex([(0.0, 10.0, "long"), (2.0, 3.0, "inside"), (11.0, 12.0, "after")])
+    assert subtitles.next_boundary(1.0, active=0) == 2.0
+    assert subtitles.next_boundary(2.5, active=0) == 10.0
+    assert subtitles.next_boundary(10.5) == 11.0
+    assert subtitles.next_boundary(11.5, active=2) == 12.0
+    assert subtitles.next_boundary(13.0) == float('inf')
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_find_does_not_change_before_next_boundary(seed):
+    subtitles = CueIndex(make_overlapping_cues(200, seed))
+    rng = random.Random(seed)
+    for _ in range(1000):
+        time_sec = rng.uniform(0.0, subtitles.max_ends[-1])
+        active = subtitles.find(time_sec)
+        boundary = subtitles.next_boundary(time_sec, active)
+        assert boundary > time_sec
+        if boundary != float('inf'):
+            between = time_sec + (boundary - time_sec) * rng.uniform(0.0, 0.999)
+            assert subtitles.find(between) == active, (time_sec, between, boundary)
+
+
+def test_pane_shows_window_around_active_cue():
+    subtitles = multiline_cues(20)
+    widget = FakeText()
+    pane = SubtitlePane(widget, before=3, after=2)
+    assert pane.render(subtitles, 10)
+    assert widget.text == pane_text(subtitles, 7, 12)
+    assert widget.underlined() == subtitles.contents[10]
+    assert widget.state == "disabled"
+
+
+def test_pane_does_no_widget_work_for_the_same_cue():
+    subtitles = multiline_cues(20)
+    widget = FakeText()
+    pane = SubtitlePane(widget)
+    pane.render(subtitles, 10)
+    edits = len(widget.edits)
+    assert not pane.render(subtitles, 10)
+    assert not pane.render(subtitles, -1)
+    assert len(widget.edits) == edits
+    assert widget.text == pane_text(subtitles, 7, 12)
+
+
+def test_pane_moving_forward_only_touches_cues_entering_and_leaving():
+    subtitles = multiline_cues(20)
+    widget = FakeText()
+    pane = SubtitlePane(widget, before=3, after=2)
+    pane.render(subtitles, 10)
+    widget.edits = []
+    pane.render(subtitles, 11)
+    assert widget.edits == [('delete', subtitles.contents[7] + "\n\n"), ('insert', subtitles.contents[13] + "\n\n")]
+    assert widget.text == pane_text(subtitles, 8, 13)
+    assert widget.underlined() == subtitles.contents[11]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_pane_incremental_updates_match_a_fresh_render(seed):
+    subtitles = multiline_cues(60, seed)
+    rng = random.Random(seed)
+    widget = FakeText()
+    pane = SubtitlePane(widget, before=3, after=2)
+    active = 0
+    for _ in range(300):
+        # Mostly playback, sometimes short seeks either way or long jumps (also to the edges)
+        step = rng.choice((1, 1, 1, 2, -1, -3, 4, rng.randrange(-60, 60)))
+        active = min(len(subtitles) - 1, max(0, active + step))
+        pane.render(subtitles, active)
+        first, last = max(0, active - 3), min(len(subtitles) - 1, active + 2)
+        assert widget.text == pane_text(subtitles, first, last), active
+        assert widget.underlined() == subtitles.contents[active], active
+
+
+def test_pane_rebuilds_for_new_subtitles_and_after_reset():
+    widget = FakeText()
+    pane = SubtitlePane(widget)
+    first, second = multiline_cues(20, seed=1), multiline_cues(20, seed=2)
+    pane.render(first, 5)
+    pane.render(second, 5)
+    assert widget.text == pane_text(second, 2, 7)
+
+    widget.text = "replaced elsewhere"
+    pane.reset()
+    assert pane.render(second, 5)
+    assert widget.text == pane_text(second, 2, 7)
+    assert widget.underlined() == second.contents[5]
+
+
+def cue_list(subtitles):
+    return [(pytest.approx(start), pytest.approx(end), content) for start, end, content in subtitles]
+
+
+def test_parse_srt():
+    assert cue_list(parse_srt(SRT)) == [(1.0, 2.5, "Hello\nworld"), (3.0, 4.0, "Second cue")]
+
+
+def test_parse_srt_lines_strips_crlf_from_raw_lines():
+    # newline='' keeps the "\r\n" endings on the lines, as reading a file in that mode does
+    lines = io.StringIO(SRT.replace("\n", "\r\n"), newline='')
+    assert cue_list(parse_srt_lines(lines)) == [(1.0, 2.5, "Hello\nworld"), (3.0, 4.0, "Second cue")]
+
+
+def test_parse_srt_ignores_bom():
+    assert cue_list(parse_srt("\ufeff" + SRT))[0] == (1.0, 2.5, "Hello\nworld")
+
+
+def test_parse_srt_without_blank_lines_or_numbers():
+    content = ("1\n00:00:01,000 --> 00:00:02,000\nFirst\n"
+               "2\n00:00:03,000 --> 00:00:04,000\nSecond\n"
+               "00:00:05,000 --> 00:00:06,000\nThird")  # No number, no final newline
+    assert cue_list(parse_srt(content)) == [(1.0, 2.0, "First"), (3.0, 4.0, "Second"), (5.0, 6.0, "Third")]
+
+
+def test_parse_srt_timing_variants_and_junk():
+    content = ("junk before the first cue\n\n"
+               "1\n0:00:01.5 --> 0:00:02.25 X1:10 X2:20\nShort fields\n\n"
+               "2\nnot a timing line\nlost text\n\n"
+               "3\n01:02:03,004 --> 01:02:04,000\nLong\n\n")
+    assert cue_list(parse_srt(content)) == [(1.5, 2.25, "Short fields"), (3723.004, 3724.0, "Long")]
+
+
+def test_parse_srt_sorts_cues():
+    content = "1\n00:00:05,000 --> 00:00:06,000\nLater\n\n2\n00:00:01,000 --> 00:00:02,000\nEarlier\n"
+    assert parse_srt(content).contents == ["Earlier", "Later"]
+
+
+def test_decode_subtitle_bytes_boms():
+    assert decode_subtitle_bytes(b"\xef\xbb\xbf" + "caf\u00e9".encode('utf-8')) == ("caf\u00e9", 'utf-8-sig')
+    assert decode_subtitle_bytes("caf\u00e9".encode('utf-16')) == ("caf\u00e9", 'utf-16')
+    assert decode_subtitle_bytes("caf\u00e9".encode('utf-8')) == ("caf\u00e9", 'utf-8')
+
+
+def test_decode_subtitle_bytes_falls_back_to_legacy_codepages(monkeypatch):
+    monkeypatch.setattr(subtitles_module, 'FALLBACK_ENCODINGS', ('cp1252',))
+    text = "na\u00efve caf\u00e9 \u2013 \u20ac5"
+    assert decode_subtitle_bytes(text.encode('cp1252')) == (text, 'cp1252')
+    # 0x81 is undefined in cp1252; latin-1 takes any byte
+    assert decode_subtitle_bytes(b"a\x81b") == ("a\x81b", 'latin-1')
+    assert decode_subtitle_bytes(text.encode('cp1252'), encoding='cp1250')[1] == 'cp1250'
+
+
+def test_load_srt_reads_cp1252_crlf_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(subtitles_module, 'FALLBACK_ENCODINGS', ('cp1252',))
+    path = tmp_path / "legacy.srt"
+    path.write_bytes(SRT.replace("Second cue", "Caf\u00e9 \u2013 cr\u00e8me").replace("\n", "\r\n").encode('cp1252'))
+    assert cue_list(load_srt(str(path))) == [(1.0, 2.5, "Hello\nworld"), (3.0, 4.0, "Caf\u00e9 \u2013 cr\u00e8me")]
+
+
+def test_write_srt_round_trip(tmp_path):
+    subtitles = multiline_cues(30)
+    path = str(tmp_path / "out.srt")
+    write_srt(subtitles, path)
+    assert cue_list(load_srt(path)) == list(subtitles)
@@ -0,0 +1,230 @@
+import sys
+import os
+import json
+import math
+import shutil
+import logging
+import argparse
+import subprocess
+import tkinter as tk
+
+from subs import check_ffmpeg, collect_video_files
+
+THUMBNAIL_WIDTH = 160
+THUMBNAIL_COLUMNS = 10
+THUMBNAIL_MIN_INTERVAL = 5
+# Long videos get a coarser interval instead of an ever larger sprite
+THUMBNAIL_MAX_COUNT = 600
+THUMBNAIL_JPEG_QUALITY = 5
+# Bump when the sprite layout changes so old sprites are rebuilt
+THUMBNAIL_INDEX_VERSION = 1
+
+
+def thumbnail_paths(video_file):
+    """
+    Sprite sheet and index cached beside the video.
+    """
+    base = os.path.splitext(video_file)[0]
+    return f"{base}.thumbs.jpg", f"{base}.thumbs.json"
+
+
+def probe_video(video_file):
+    """
+    Return (duration in seconds, width, height) of the first video stream, or None.
+    """
+    try:
+        result = subprocess.run([
+            "ffprobe",
+            "-v", "quiet",
+            "-print_format", "json",
+            "-show_format",
+            "-show_streams",
+            "-select_streams", "v:0",
+            video_file
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        info = json.loads(result.stdout.decode('utf-8', errors='replace'))
+        stream = info["streams"][0]
+        return float(info["format"]["duration"]), int(stream["width"]), int(stream["height"])
+    except Exception as e:
+        logging.error(f"Error probing {video_file}: {e}")
+        return None
+
+
+def low_priority(command):
+    """
+    Command and Popen arguments that run ffmpeg below normal priority, so playback
+    keeps the CPU. Elsewhere than on Windows this goes through nice(1): preexec_fn
+    is not safe in a process with threads, and thumbnails are built on one.
+
+    Returns:
+        tuple: (command, Popen keyword arguments)
+    """
+    if sys.platform == "win32":
+        return command, {'creationflags': subprocess.BELOW_NORMAL_PRIORITY_CLASS}
+    if shutil.which("nice"):
+        return ["nice", "-n", "10"] + command, {}
+    return command, {}
+
+
+def load_thumbnail_index(video_file):
+    """
+    Return the cached index if it still matches the video, else None.
+    """
+    sprite_file, index_file = thumbnail_paths(video_file)
+    if not (os.path.exists(sprite_file) and os.path.exists(index_file)):
+        return None
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        stat = os.stat(video_file)
+        if (index.get('version') == THUMBNAIL_INDEX_VERSION and index.get('video_size') == stat.st_size
+                and index.get('video_mtime') == stat.st_mtime):
+            return index
+    except Exception as e:
+        logging.error(f"Error reading thumbnail index {index_file}: {e}")
+    return None
+
+
+def generate_thumbnails(video_file, width=THUMBNAIL_WIDTH, columns=THUMBNAIL_COLUMNS, force=False):
+    """
+    Build a sprite sheet of evenly spaced low-resolution frames and a JSON index
+    (interval, grid and tile size). Only keyframes are decoded, so each thumbnail
+    shows the keyframe at or before its time. Cached beside the video and reused
+    until the video changes.
+
+    Returns:
+        dict: The index, or None if ffmpeg failed
+    """
+    if not force:
+        index = load_thumbnail_index(video_file)
+        if index:
+            return index
+
+    probed = probe_video(video_file)
+    if not probed:
+        return None
+    duration, video_width, video_height = probed
+    interval = max(THUMBNAIL_MIN_INTERVAL, duration / THUMBNAIL_MAX_COUNT)
+    count = max(1, math.ceil(duration / interval))
+    rows = math.ceil(count / columns)
+    height = max(2, round(width * video_height / video_width / 2) * 2)
+
+    sprite_file, index_file = thumbnail_paths(video_file)
+    temp_file = f"{os.path.splitext(sprite_file)[0]}.tmp.jpg"
+    command = [
+        "ffmpeg", "-y", "-nostdin", "-loglevel", "error",
+        "-skip_frame", "nokey",
+        "-i", video_file,
+        "-an", "-sn",
+        "-vf", f"fps=1/{interval},scale={width}:{height},tile={columns}x{rows}",
+        "-frames:v", "1",
+        "-q:v", str(THUMBNAIL_JPEG_QUALITY),
+        temp_file
+    ]
+    try:
+        command, options = low_priority(command)
+        subprocess.run(command, check=True, **options)
+        os.replace(temp_file, sprite_file)
+    except (subprocess.CalledProcessError, OSError) as e:
+        logging.error(f"Error generating thumbnails for {video_file}: {e}")
+        return None
+
+    stat = os.stat(video_file)
+    index = {
+        'version': THUMBNAIL_INDEX_VERSION,
+        'video_size': stat.st_size,
+        'video_mtime': stat.st_mtime,
+        'duration': duration,
+        'interval': interval,
+        'count': count,
+        'columns': columns,
+        'rows': rows,
+        'width': width,
+        'height': height
+    }
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    logging.info(f"Thumbnails for {video_file}: {count} frames every {interval:.1f} seconds")
+    return index
+
+
+def thumbnail_box(index, seconds):
+    """
+    Pixel box (left, top, right, bottom) in the sprite of the thumbnail for a time.
+    """
+    number = min(index['count'] - 1, max(0, int(seconds / index['interval'])))
+    row, column = divmod(number, index['columns'])
+    left, top = column * index['width'], row * index['height']
+    return left, top, left + index['width'], top + index['height']
+
+
+class ThumbnailPreview:
+    """
+    Shows the sprite frame under the pointer while hovering a time slider (0..1000),
+    without touching the player. Needs Pillow to crop the JPEG sprite.
+    """
+
+    def __init__(self, slider):
+        self.slider = slider
+        self.index = None
+        self.sprite = None
+        self.image = None
+        self.window = None
+        self.label = None
+        self.slider.bind("<Motion>", self.show, add="+")
+        self.slider.bind("<Leave>", self.hide, add="+")
+
+    def load(self, video_file, index):
+        """
+        Use the sprite of video_file; index=None disables the preview.
+        """
+        self.index = None
+        self.sprite = None
+        if not index:
+            return
+        try:
+            from PIL import Image
+            sprite = Image.open(thumbnail_paths(video_file)[0])
+            sprite.load()
+            self.sprite, self.index = sprite, index
+        except Exception as e:
+            logging.error(f"Error loading thumbnail sprite for {video_file}: {e}")
+
+    def show(self, event):
+        if not self.index:
+            return
+        from PIL import ImageTk
+        start, end = self.slider.coords(0)[0], self.slider.coords(1000)[0]
+        fraction = min(1, max(0, (event.x - start) / max(1, end - start)))
+        box = thumbnail_box(self.index, fraction * self.index['duration'])
+        self.image = ImageTk.PhotoImage(self.sprite.crop(box))
+
+        if self.window is None:
+            self.window = tk.Toplevel(self.slider)
+            self.window.overrideredirect(True)
+            self.label = tk.Label(self.window, bd=1, relief=tk.SOLID)
+            self.label.pack()
+        self.label.config(image=self.image)
+        x = event.x_root - self.index['width'] // 2
+        y = self.slider.winfo_rooty() - self.index['height'] - 8
+        self.window.geometry(f"+{x}+{y}")
+        self.window.deiconify()
+
+    def hide(self, event=None):
+        if self.window is not None:
+            self.window.withdraw()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Generate scrub preview sprites beside videos.")
+    parser.add_argument("paths", nargs="+", help="Video files, directories or glob patterns")
+    parser.add_argument("--force", action="store_true", help="Rebuild sprites that are up to date")
+    args = parser.parse_args()
+
+    if not check_ffmpeg():
+        logging.error("FFmpeg is not installed or not in your system PATH.")
+        sys.exit(1)
+    failed = [video_file for video_file in collect_video_files(args.paths)
+              if not generate_thumbnails(video_file, force=args.force)]
+    sys.exit(1 if failed else 0)
@@ -1,37 +1,96 @@
+import time
+STARTUP_STARTED = time.perf_counter()
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import vlc
 import os
 import sys
 import logging
-from screeninfo import get_monitors
-import re
-from datetime import timedelta
-import json
-import time
-from openai import OpenAI
-import webbrowser
-
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("video_player.log"),
-        logging.StreamHandler()
-    ]
-)
+import threading
+from subtitles import CueIndex, SubtitlePane, load_srt_cached, parse_srt, parse_time
+from playback import PlaybackClock, VlcEventBridge, set_video_output
+from explanations import ExplanationCache, ExplanationPrefetcher, ExplanationWorker
+from persistence import PlayerStateStore
+from logsetup import get_hot_logger, setup_logging
+from thumbnails import ThumbnailPreview, generate_thumbnails
+from subtitle_index import SubtitleIndex
+from montage import ClipMontage, build_playlist
+from alignment import align_subtitles_cached
+
+# Log how long each startup phase took: python video1.py --startup-timing
+STARTUP_TIMING = "--startup-timing" in sys.argv or bool(os.environ.get("VIDEO_PLAYER_STARTUP_TIMING"))
+
+# Seeking, volume and subtitle jumps repeat while a slider is dragged or a key is held
+hot_log = get_hot_logger("video_player.hot")
+
+# Refresh rates of the periodic playback tasks, in milliseconds
+SLIDER_INTERVAL_MS = 500
+TIME_LABEL_INTERVAL_MS = 500
+# Subtitles wake up exactly at the next cue boundary; without VLC events they
+# also re-check at least this often in case playback drifted from the prediction
+SUBTITLE_MAX_WAIT_MS = 1000
+SUBTITLE_MIN_WAIT_MS = 10
+# After a seek VLC may still report the old time for a moment (polling mode)
+SEEK_SETTLE_SECONDS = 0.5
+# While the time slider is dragged, seek at most this often; the exact seek happens on release
+SCRUB_SEEK_INTERVAL_MS = 150
+# Let the right subtitle pane follow the left one through an automatic cue alignment
+ALIGN_SUBTITLES = True
+
+# Build a thumbnail sprite per video in the background and preview it when hovering the time slider
+SHOW_THUMBNAIL_PREVIEW = True
+# How often the playback position is saved while playing, so a crash loses little
+POSITION_CHECKPOINT_MS = 5000
+
+# Follow playback through VLC events instead of polling the player. Paused playback
+# then costs no timer ticks at all and the subtitle panes refresh only at cue boundaries.
+USE_VLC_EVENTS = True
+
+# Show AI explanations word by word as they are generated
+STREAM_AI_EXPLANATIONS = True
+
+# Opt-in: explain uncommon words of the next few left subtitles in the background
+PREFETCH_EXPLANATIONS = False
+PREFETCH_LOOKAHEAD_CUES = 5
+
+class StartupTimer:
+    """
+    Collects the duration of each startup phase for the --startup-timing report.
+    """
+
+    def __init__(self, started=STARTUP_STARTED):
+        self.started = self.last = started
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self):
+        phases = ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in self.phases)
+        logging.info(f"Startup timing: {phases}; total {(self.last - self.started) * 1000:.0f} ms")
 
-DATA_FILE = "video_player_data.json"
 
 class VideoPlayer:
     def __init__(self, master):
+        self.startup_timer = StartupTimer()
+        self.startup_timer.mark("imports")
 
         self.last_user_seek_time = 0
-        self.last_update_time = 0
         self.last_position = 0
 
         self.slider_update_in_progress = False
+        # Time slider scrubbing: latest requested position and the pending throttled seek
+        self.slider_dragging = False
+        self.slider_set_value = None
+        self.scrub_target_ms = None
+        self.scrub_handle = None
+        self.last_scrub_seek = 0
+        self.frame_step_handle = None
+        self.loaded_video_file = None
+        self.pending_start_time = None
+        self.length = 0
         self.master = master
         self.master.title("Main Video Window")
         self.master.geometry("800x600")
@@ -39,6 +98,7 @@ class VideoPlayer:
         # Initialize VLC player
         self.instance = vlc.Instance()
         self.player = self.instance.media_player_new()
+        self.startup_timer.mark("vlc")
 
         # Video frame in main window
         self.video_frame = tk.Frame(self.master, bg="black")
@@ -49,18 +109,34 @@ class VideoPlayer:
         # self.video_frame.config(cursor="right_ptr")  # Optional: Change cursor to indicate right-click functionality
 
         # Initialize subtitle variables
-        self.left_subtitles = []
-        self.right_subtitles = []
+        self.left_subtitles = CueIndex()
+        self.right_subtitles = CueIndex()
         self.left_subtitle_index = 0
         self.right_subtitle_index = 0
         self.is_closed = False  # Flag to handle closure
 
-        # Initialize persistent data
-        self.persistent_data = {}
-        self.load_persisted_data()
+        # Playback position as last reported by VLC events (event mode only)
+        self.event_time_ms = 0
+        self.event_time_stamp = None
+        self.playback_rate = 1.0
+        self.waiting_for_length = False
+        # Set from opening a video until its resume point has been restored
+        self.restore_pending = False
+        self.last_seek_stamp = 0
+
+        # Time range in which neither subtitle pane can change, in seconds
+        self.subtitle_valid_from = 0
+        self.subtitle_valid_until = 0
+
+        # Per-video state is opened with the first video and written in the background
+        self.state_store = None
+        self.subtitle_index = None
+        self.subtitle_index_lock = threading.Lock()
+        self.montage = None
 
         # Create Controls Window
         self.create_controls_window()
+        self.startup_timer.mark("controls window")
 
         # Embed VLC Video
         self.embed_video()
@@ -69,8 +145,37 @@ class VideoPlayer:
         self.master.protocol("WM_DELETE_WINDOW", self.on_close)
         self.controls_window.protocol("WM_DELETE_WINDOW", self.on_close)
 
-        # Update the slider periodically
-        self.update_slider()
+        # One clock drives the slider, time label and subtitle panes while playing.
+        # In event mode VLC reports play/pause, and subtitles follow time-changed events.
+        self.clock = PlaybackClock(self.master, None if USE_VLC_EVENTS else self.player.is_playing)
+        self.clock.add_task('slider', self.update_slider, SLIDER_INTERVAL_MS)
+        self.clock.add_task('time_label', self.update_time_label, TIME_LABEL_INTERVAL_MS)
+        self.clock.add_task('subtitles', self.update_subtitles, None if USE_VLC_EVENTS else SUBTITLE_MAX_WAIT_MS)
+        self.clock.add_task('checkpoint', self.checkpoint_position, POSITION_CHECKPOINT_MS)
+        # Hands VLC events and background results over to the Tk thread; idle while paused
+        self.events = VlcEventBridge(self.master, is_active=lambda: not self.clock.paused)
+        if USE_VLC_EVENTS:
+            self.attach_vlc_events()
+        self.clock.start()
+
+        # AI explanations are fetched on a background thread; the disk cache is opened
+        # once the windows are up (see finish_startup) and the OpenAI client on first use
+        self.explanation_cache = None
+        self.explanation_worker = ExplanationWorker(lambda result: self.events.post('ai', result),
+                                                    stream=STREAM_AI_EXPLANATIONS)
+        self.ai_request_id = None
+        self.ai_display_length = 0
+        self.explanation_prefetcher = None
+        self.events.add_handler('ai', self.show_ai_explanation)
+
+        self.subtitle_alignment = None
+        self.events.add_handler('alignment', self.on_alignment_ready)
+
+        self.thumbnail_preview = ThumbnailPreview(self.time_slider)
+        self.events.add_handler('thumbnails', self.on_thumbnails_ready)
+        self.events.add_handler('resync', self.on_resync_ready)
+        self.events.add_handler('search', self.on_search_ready)
+        self.events.add_handler('playphrase', self.on_playphrase_ready)
 
         # Initialize playback flags
         self.is_fullscreen = False
@@ -90,6 +195,8 @@ class VideoPlayer:
         self.master.bind('<Right>', lambda event: self.seek_relative(5))
         self.master.bind('<plus>', self.jump_to_next_subtitle)
         self.master.bind('*', self.cycle_audio_track)  # Add binding for * key
+        self.master.bind('[', lambda event: self.change_playback_rate(-0.1))
+        self.master.bind(']', lambda event: self.change_playback_rate(0.1))
         
 
         
@@ -99,32 +206,77 @@ class VideoPlayer:
         # Initialize audio and subtitle stream variables
         self.current_audio_track = -1
         self.current_subtitle_track = -1
+        self.startup_timer.mark("player setup")
 
-    def load_persisted_data(self):
-        """
-        Load persisted data from the JSON file.
-        """
-        if os.path.exists(DATA_FILE):
-            try:
-                with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                    self.persistent_data = json.load(f)
-                logging.info("Persisted data loaded successfully.")
-            except Exception as e:
-                logging.error(f"Error loading persisted data: {e}")
-                self.persistent_data = {}
-        else:
-            self.persistent_data = {}
+        # Everything else waits until the windows have been drawn
+        self.master.after_idle(self.finish_startup)
 
-    def save_persisted_data(self):
+    def finish_startup(self):
         """
-        Save current video state to the JSON file.
+        Second startup stage, run once the windows are on screen.
         """
+        self.startup_timer.mark("first frame")
+        if self.is_closed:
+            return
         try:
-            with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.persistent_data, f, indent=4)
-            logging.info("Persisted data saved successfully.")
+            self.explanation_cache = ExplanationCache()
+            self.explanation_worker.cache = self.explanation_cache
         except Exception as e:
-            logging.error(f"Error saving persisted data: {e}")
+            logging.error(f"Error opening explanation cache: {e}")
+        if PREFETCH_EXPLANATIONS and self.explanation_cache:
+            self.explanation_prefetcher = ExplanationPrefetcher(self.explanation_worker,
+                                                                lookahead=PREFETCH_LOOKAHEAD_CUES)
+        self.startup_timer.mark("explanation cache")
+        if STARTUP_TIMING:
+            self.startup_timer.report()
+
+    def get_state_store(self):
+        """
+        The per-video state store, opened on first use.
+        """
+        if self.state_store is None:
+            self.state_store = PlayerStateStore()
+            self.state_store.start()
+        return self.state_store
+
+    def get_video_path(self):
+        """
+        Absolute path of the loaded video, or None if nothing is loaded.
+        """
+        media = self.player.get_media()
+        if not media:
+            return None
+        video_path = media.get_mrl()
+        if video_path.startswith("file://"):
+            video_path = video_path[7:]  # Remove 'file://' prefix
+        return os.path.abspath(video_path)
+
+    def save_video_state(self, video_path):
+        """
+        Queue the full state of the loaded video for saving.
+        """
+        current_time = self.player.get_time() / 1000 if self.player.get_time() > 0 else 0
+        self.get_state_store().update(
+            video_path,
+            left_subtitle=getattr(self, 'left_subtitle_path', None),
+            right_subtitle=getattr(self, 'right_subtitle_path', None),
+            last_playback_time=current_time,
+            audio_track=self.current_audio_track,
+            subtitle_track=self.current_subtitle_track,
+            volume=self.player.audio_get_volume()
+        )
+        logging.info(f"Persisted state for {video_path} saved at {current_time} seconds.")
+
+    def checkpoint_position(self):
+        """
+        Periodic task: save the playback position while playing.
+        """
+        if self.waiting_for_length or self.restore_pending:
+            return  # The position still belongs to the previous video or precedes the resume seek
+        video_path = self.get_video_path()
+        current_time = self.get_current_time_ms() / 1000
+        if video_path and current_time > 0:
+            self.get_state_store().update(video_path, last_playback_time=current_time)
 
     def load_video(self):
         """
@@ -135,28 +287,69 @@ class VideoPlayer:
             filetypes=[("Video Files", "*.mp4 *.mkv *.avi *.mov")]
         )
         if file_path:
-            try:
-                # Reset subtitle paths
-                self.left_subtitle_path = None
-                self.right_subtitle_path = None
-
-                media = self.instance.media_new(file_path)
-                self.player.set_media(media)
-                self.player.play()
-                self.play_pause_btn.config(text="Pause")
-                logging.info(f"Playing video: {file_path}")
-
-                # Initialize video length retrieval
-                self.length = 0
+            self.open_video(file_path)
+
+    def open_video(self, file_path, start_time=None):
+        """
+        Play a video, restoring its persisted state.
+
+        Args:
+            file_path (str): Video file
+            start_time (float): Start here (seconds) instead of the last playback position
+        """
+        try:
+            previous_path = self.get_video_path()
+            if previous_path:
+                self.save_video_state(previous_path)
+
+            # Reset subtitle paths
+            self.left_subtitle_path = None
+            self.right_subtitle_path = None
+
+            self.loaded_video_file = file_path
+            self.pending_start_time = start_time
+            # Forget the previous video's position before any task runs for the new one,
+            # and keep checkpoints from overwriting the resume point until it is restored
+            self.length = 0
+            self.event_time_ms = 0
+            self.event_time_stamp = None
+            self.restore_pending = True
+            self.waiting_for_length = USE_VLC_EVENTS
+            media = self.instance.media_new(file_path)
+            self.player.set_media(media)
+            self.player.play()
+            self.events.wake()
+            self.play_pause_btn.config(text="Pause")
+            self.clock.resume()
+            logging.info(f"Playing video: {file_path}")
+
+            # on_length_changed will handle loading subtitles and seeking in event mode
+            if not USE_VLC_EVENTS:
                 self.get_video_length()  # This will handle loading subtitles and seeking
 
-                # After some delay, load audio and subtitle tracks
-                self.master.after(1000, self.load_audio_tracks)
-                self.master.after(1500, self.load_subtitle_tracks)
+            self.thumbnail_preview.load(file_path, None)
+            if SHOW_THUMBNAIL_PREVIEW:
+                threading.Thread(target=self.build_thumbnails, args=(file_path,), daemon=True).start()
 
-            except Exception as e:
-                logging.error(f"Error loading video: {e}")
-                messagebox.showerror("Error", f"Failed to load video.\n{str(e)}")
+            # After some delay, load audio and subtitle tracks
+            self.master.after(1000, self.load_audio_tracks)
+            self.master.after(1500, self.load_subtitle_tracks)
+
+        except Exception as e:
+            logging.error(f"Error loading video: {e}")
+            messagebox.showerror("Error", f"Failed to load video.\n{str(e)}")
+
+    def build_thumbnails(self, file_path):
+        """
+        Background thread: build (or reuse) the video's thumbnail sprite.
+        """
+        index = generate_thumbnails(file_path)
+        self.events.post('thumbnails', (file_path, index))
+
+    def on_thumbnails_ready(self, value):
+        file_path, index = value
+        if index and file_path == self.loaded_video_file:
+            self.thumbnail_preview.load(file_path, index)
 
     def get_video_length(self):
         """
@@ -179,6 +372,104 @@ class VideoPlayer:
             logging.error(f"Error getting video length: {e}")
             self.length = 0
 
+    def attach_vlc_events(self):
+        """
+        Subscribe to VLC player events. They are delivered on the Tk thread by the bridge.
+        """
+        try:
+            event_manager = self.player.event_manager()
+            self.events.attach(event_manager, vlc.EventType.MediaPlayerTimeChanged, 'time',
+                               self.on_time_changed, lambda event: event.u.new_time)
+            self.events.attach(event_manager, vlc.EventType.MediaPlayerLengthChanged, 'length',
+                               self.on_length_changed, lambda event: event.u.new_length)
+            for event_type, state in ((vlc.EventType.MediaPlayerPlaying, 'playing'),
+                                      (vlc.EventType.MediaPlayerPaused, 'paused'),
+                                      (vlc.EventType.MediaPlayerStopped, 'stopped'),
+                                      (vlc.EventType.MediaPlayerEndReached, 'stopped')):
+                self.events.attach(event_manager, event_type, 'state',
+                                   self.on_playback_state, lambda event, state=state: state)
+            logging.info("Attached to VLC player events.")
+        except Exception as e:
+            logging.error(f"Error attaching VLC events: {e}")
+
+    def on_playback_state(self, state):
+        """
+        Start or stop the periodic tasks when VLC starts or stops playing.
+        """
+        if state == 'playing':
+            self.event_time_stamp = time.monotonic()
+            self.play_pause_btn.config(text="Pause")
+            self.clock.resume()
+        else:
+            self.event_time_ms = self.get_current_time_ms()
+            self.event_time_stamp = None
+            self.play_pause_btn.config(text="Play")
+            self.clock.pause()
+
+    def on_time_changed(self, time_ms):
+        """
+        Record the playback time reported by VLC and refresh the subtitle panes
+        if it crossed a cue boundary (or jumped backwards after a seek).
+        """
+        self.event_time_ms = time_ms
+        if self.event_time_stamp is not None:
+            self.event_time_stamp = time.monotonic()
+        current_time = time_ms / 1000
+        # The boundary timer normally handles cue changes; this catches seeks made
+        # outside this class. Small backward jitter against the extrapolated time is ignored.
+        if not self.subtitle_valid_from - 0.5 <= current_time < self.subtitle_valid_until:
+            self.clock.trigger('subtitles')
+
+    def on_length_changed(self, length_ms):
+        """
+        Replaces polling get_length(): once VLC knows the length, restore the persisted state.
+        """
+        if length_ms <= 0:
+            return
+        self.length = length_ms / 1000  # Convert to seconds
+        if self.waiting_for_length:
+            self.waiting_for_length = False
+            logging.info(f"Video length: {self.length} seconds.")
+            self.load_persisted_subtitles_and_seek()
+
+    def on_seek(self, time_ms):
+        """
+        Re-anchor the playback position after a seek and re-plan the subtitle wake-up.
+        """
+        self.event_time_ms = max(0, time_ms)
+        self.event_time_stamp = time.monotonic() if self.player.is_playing() else None
+        self.last_seek_stamp = time.monotonic()
+        self.events.wake()
+        self.clock.trigger('subtitles')
+
+    def change_playback_rate(self, delta):
+        """
+        Speed playback up or down; the subtitle wake-up is re-planned for the new rate.
+        """
+        try:
+            rate = round(min(4.0, max(0.25, self.playback_rate + delta)), 2)
+            self.event_time_ms = self.get_current_time_ms()
+            if self.event_time_stamp is not None:
+                self.event_time_stamp = time.monotonic()
+            self.player.set_rate(rate)
+            self.playback_rate = rate
+            self.clock.trigger('subtitles')
+            logging.info(f"Playback rate set to: {rate}")
+        except Exception as e:
+            logging.error(f"Error changing playback rate: {e}")
+
+    def get_current_time_ms(self):
+        """
+        Current playback time in milliseconds. In event mode (and right after a seek)
+        this is extrapolated from the last known position, so the periodic tasks
+        do not call into VLC.
+        """
+        if not USE_VLC_EVENTS and time.monotonic() - self.last_seek_stamp > SEEK_SETTLE_SECONDS:
+            return self.player.get_time()
+        if self.event_time_stamp is None:
+            return self.event_time_ms
+        return self.event_time_ms + (time.monotonic() - self.event_time_stamp) * 1000 * self.playback_rate
+
     def load_persisted_subtitles_and_seek(self):
         """
         Load associated subtitles and seek to the last playback position if available.
@@ -186,18 +477,18 @@ class VideoPlayer:
         """
         try:
             # Get the current video path in absolute form
-            media = self.player.get_media()
-            if not media:
+            video_path = self.get_video_path()
+            if not video_path:
                 logging.warning("No media is currently loaded.")
+                self.restore_pending = False
                 return
 
-            video_path = media.get_mrl()
-            if video_path.startswith("file://"):
-                video_path = video_path[7:]  # Remove 'file://' prefix
-            video_path = os.path.abspath(video_path)
+            # A search hit asks for a start time of its own
+            start_time, self.pending_start_time = self.pending_start_time, None
+            restore_time = start_time
 
             # Check if there's persisted data for this video
-            video_data = self.persistent_data.get(video_path)
+            video_data = self.get_state_store().get(video_path)
             if video_data:
                 left_sub_path = video_data.get('left_subtitle')
                 right_sub_path = video_data.get('right_subtitle')
@@ -233,8 +524,9 @@ class VideoPlayer:
                     self.left_subtitles = self.load_subtitle_file(left_sub_path)
                     self.left_subtitle_text.config(state=tk.NORMAL)
                     self.left_subtitle_text.delete(1.0, tk.END)
-                    self.left_subtitle_text.insert(tk.END, "\n\n".join([s['content'] for s in self.left_subtitles]))
+                    self.left_subtitle_text.insert(tk.END, "\n\n".join(self.left_subtitles.contents))
                     self.left_subtitle_text.config(state=tk.DISABLED)
+                    self.left_subtitle_pane.reset()
                     self.left_subtitle_path = os.path.abspath(left_sub_path)
                     logging.info(f"Left subtitles loaded from {left_sub_path}")
                 else:
@@ -246,8 +538,9 @@ class VideoPlayer:
                     self.right_subtitles = self.load_subtitle_file(right_sub_path)
                     self.right_subtitle_text.config(state=tk.NORMAL)
                     self.right_subtitle_text.delete(1.0, tk.END)
-                    self.right_subtitle_text.insert(tk.END, "\n\n".join([s['content'] for s in self.right_subtitles]))
+                    self.right_subtitle_text.insert(tk.END, "\n\n".join(self.right_subtitles.contents))
                     self.right_subtitle_text.config(state=tk.DISABLED)
+                    self.right_subtitle_pane.reset()
                     self.right_subtitle_path = os.path.abspath(right_sub_path)
                     logging.info(f"Right subtitles loaded from {right_sub_path}")
                 else:
@@ -255,17 +548,37 @@ class VideoPlayer:
                         logging.warning(f"Right subtitle file not found: {right_sub_path}")
                         messagebox.showwarning("Warning", f"Right subtitle file not found: {right_sub_path}")
 
+                # New cues: refresh the panes on the next time update
+                self.subtitle_valid_until = 0
+                self.align_subtitle_tracks()
+
                 # Resume playback from last saved time
-                if last_time > 0:
-                    # Ensure that seeking happens after a short delay to allow playback to stabilize
-                    self.master.after(500, lambda: self.seek_to_time(last_time))
+                if last_time > 0 and start_time is None:
+                    restore_time = last_time
 
                 # Restore audio and subtitle tracks after a delay
                 self.master.after(1000, self.restore_audio_and_subtitle_tracks)
 
+            if restore_time is not None:
+                # Ensure that seeking happens after a short delay to allow playback to stabilize
+                file_path = self.loaded_video_file
+                self.master.after(500, lambda: self.restore_position(file_path, restore_time))
+            else:
+                self.restore_pending = False
+
         except Exception as e:
+            self.restore_pending = False
             logging.error(f"Error loading persisted subtitles and seeking playback: {e}")
 
+    def restore_position(self, file_path, seconds):
+        """
+        Seek to the resume point of a newly opened video; checkpoints start after it.
+        """
+        if file_path != self.loaded_video_file:
+            return  # Another video was opened meanwhile
+        self.seek_to_time(seconds)
+        self.restore_pending = False
+
     def restore_audio_and_subtitle_tracks(self):
         """
         Restore the saved audio and subtitle track selections.
@@ -290,6 +603,7 @@ class VideoPlayer:
         try:
             # VLC expects time in milliseconds
             self.player.set_time(int(seconds * 1000))
+            self.on_seek(int(seconds * 1000))
             logging.info(f"Resumed playback from {seconds} seconds.")
         except Exception as e:
             logging.error(f"Error seeking to time {seconds}: {e}")
@@ -300,14 +614,84 @@ class VideoPlayer:
         Load subtitles from a given SRT file.
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            subtitles = self.parse_srt(content)
+            subtitles = load_srt_cached(file_path)
+            threading.Thread(target=self.index_subtitle_file, args=(file_path, self.loaded_video_file, subtitles),
+                             daemon=True).start()
             return subtitles
         except Exception as e:
             logging.error(f"Error loading subtitle file {file_path}: {e}")
             messagebox.showerror("Error", f"Failed to load subtitle file.\n{str(e)}")
-            return []
+            return CueIndex()
+
+    def get_subtitle_index(self):
+        """
+        The full-text subtitle index, opened on first use.
+        """
+        with self.subtitle_index_lock:
+            if self.subtitle_index is None:
+                self.subtitle_index = SubtitleIndex()
+        return self.subtitle_index
+
+    def index_subtitle_file(self, file_path, video_path, subtitles):
+        """
+        Background thread: add a loaded SRT to the search index unless it is unchanged.
+        """
+        try:
+            self.get_subtitle_index().add_file(file_path, video_path, subtitles)
+        except Exception as e:
+            logging.error(f"Error indexing subtitle file {file_path}: {e}")
+
+    def search_subtitles(self, event=None):
+        """
+        Search the subtitles of the whole library for the phrase in the search box.
+        """
+        query = self.search_var.get().strip()
+        self.search_results.delete(0, tk.END)
+        self.search_hits = []
+        if not query:
+            return
+        threading.Thread(target=self.find_subtitle_hits, args=('search', query), daemon=True).start()
+
+    def find_subtitle_hits(self, event_name, query):
+        """
+        Background thread: search the subtitle index and post (query, hits, error) as event_name.
+        """
+        try:
+            self.events.post(event_name, (query, self.get_subtitle_index().search(query), None))
+        except Exception as e:
+            logging.error(f"Error searching subtitles for '{query}': {e}")
+            self.events.post(event_name, (query, [], e))
+
+    def on_search_ready(self, value):
+        query, hits, error = value
+        if query != self.search_var.get().strip():
+            return  # The search box changed while this search ran
+        if error:
+            messagebox.showerror("Error", f"Failed to search subtitles.\n{str(error)}")
+            return
+        self.search_hits = hits
+        self.search_results.delete(0, tk.END)
+        for hit in self.search_hits:
+            name = os.path.basename(hit.video_path or hit.srt_path)
+            content = " ".join(hit.content.split())
+            self.search_results.insert(tk.END, f"{name}  {self.seconds_to_time(hit.start)}  {content}")
+        logging.info(f"{len(self.search_hits)} subtitle hit(s) for '{query}'")
+
+    def open_search_hit(self, event=None):
+        """
+        Jump to the selected search hit, opening its video if another one is playing.
+        """
+        selection = self.search_results.curselection()
+        if not selection:
+            return
+        hit = self.search_hits[selection[0]]
+        loaded_path = os.path.abspath(self.loaded_video_file) if self.loaded_video_file else None
+        if hit.video_path and hit.video_path == loaded_path:
+            self.seek_to_time(hit.start)
+        elif hit.video_path and os.path.exists(hit.video_path):
+            self.open_video(hit.video_path, start_time=hit.start)
+        else:
+            messagebox.showwarning("Warning", f"No video found for {hit.srt_path}")
 
     def create_controls_window(self):
         """
@@ -315,7 +699,7 @@ class VideoPlayer:
         """
         self.controls_window = tk.Toplevel(self.master)
         self.controls_window.title("Controls")
-        self.controls_window.geometry("1100x550")
+        self.controls_window.geometry("1100x700")
         self.controls_window.resizable(True, True)
         self.controls_window.bind("<Button-3>", self.toggle_play_pause)
 
@@ -333,6 +717,8 @@ class VideoPlayer:
         self.controls_window.bind('9', lambda event: self.seek_relative(-9))
         self.controls_window.bind('<plus>', self.jump_to_next_subtitle)
         self.controls_window.bind('*', self.cycle_audio_track) 
+        self.controls_window.bind('[', lambda event: self.change_playback_rate(-0.1))
+        self.controls_window.bind(']', lambda event: self.change_playback_rate(0.1))
         
 
 
@@ -346,6 +732,7 @@ class VideoPlayer:
 
         self.left_subtitle_text = tk.Text(left_subtitle_frame, height=15, width=40, wrap=tk.WORD, font=("Arial", 14))
         self.left_subtitle_text.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
+        self.left_subtitle_pane = SubtitlePane(self.left_subtitle_text)
 
         self.left_subtitle_btn = tk.Button(left_subtitle_frame, text="Select SRT File", command=lambda: self.load_subtitles('left'))
         self.left_subtitle_btn.pack(pady=5)
@@ -356,6 +743,7 @@ class VideoPlayer:
 
         self.right_subtitle_text = tk.Text(right_subtitle_frame, height=15, width=40, wrap=tk.WORD, font=("Arial", 14))
         self.right_subtitle_text.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
+        self.right_subtitle_pane = SubtitlePane(self.right_subtitle_text)
 
         self.right_subtitle_btn = tk.Button(right_subtitle_frame, text="Select SRT File", command=lambda: self.load_subtitles('right'))
         self.right_subtitle_btn.pack(pady=5)
@@ -415,6 +803,10 @@ class VideoPlayer:
         self.playphrase_btn = tk.Button(buttons_frame, text="Playphrase", command=self.playphrase)
         self.playphrase_btn.grid(row=0, column=3, padx=5)
 
+        # Resync Subtitles Button
+        self.resync_btn = tk.Button(buttons_frame, text="Resync Subtitles", command=self.resync_subtitles)
+        self.resync_btn.grid(row=0, column=4, padx=5)
+
         # Audio Streams Frame
         audio_frame = tk.LabelFrame(self.controls_window, text="Audio Streams")
         audio_frame.grid(row=1, column=0, padx=10, pady=10, sticky="e")
@@ -437,6 +829,27 @@ class VideoPlayer:
         self.subtitle_frame_inner = tk.Frame(subtitle_stream_frame)
         self.subtitle_frame_inner.pack(anchor=tk.W)
 
+        # Library search: every indexed subtitle file, double-click a hit to jump to it
+        search_frame = tk.LabelFrame(self.controls_window, text="Search Subtitles")
+        search_frame.grid(row=5, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=self.search_var, width=40)
+        search_entry.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        # Typing must not reach the window's playback shortcuts (space, digits, ...)
+        search_entry.bindtags((str(search_entry), "Entry", "all"))
+        search_entry.bind('<Return>', self.search_subtitles)
+        tk.Button(search_frame, text="Search", command=self.search_subtitles).grid(row=0, column=1, padx=5)
+
+        search_scrollbar = tk.Scrollbar(search_frame)
+        search_scrollbar.grid(row=1, column=2, sticky="ns")
+        self.search_results = tk.Listbox(search_frame, height=5, width=120, yscrollcommand=search_scrollbar.set)
+        self.search_results.grid(row=1, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+        search_scrollbar.config(command=self.search_results.yview)
+        self.search_results.bind('<Double-Button-1>', self.open_search_hit)
+        self.search_results.bind('<Return>', self.open_search_hit)
+        self.search_hits = []
+
         # Load Subtitle Streams Button
         self.load_subtitle_streams_btn = tk.Button(subtitle_stream_frame, text="Refresh Subtitle Streams", command=self.load_subtitle_tracks)
         self.load_subtitle_streams_btn.pack(pady=5)
@@ -457,6 +870,8 @@ class VideoPlayer:
             variable=self.seek_var
         )
         self.time_slider.grid(row=0, column=0, sticky="ew", padx=5)
+        self.time_slider.bind("<ButtonPress-1>", self.start_scrub)
+        self.time_slider.bind("<ButtonRelease-1>", self.end_scrub)
 
         # Volume Slider
         self.volume_var = tk.StringVar()
@@ -480,19 +895,7 @@ class VideoPlayer:
         Embed the VLC video in the Tkinter frame.
         """
         try:
-            if sys.platform.startswith('linux'):  # for Linux using the X Server
-                self.player.set_xwindow(self.video_frame.winfo_id())
-            elif sys.platform == "win32":  # for Windows
-                self.player.set_hwnd(self.video_frame.winfo_id())
-            elif sys.platform == "darwin":  # for MacOS
-                try:
-                    from ctypes import c_void_p
-                    self.player.set_nsobject(c_void_p(self.video_frame.winfo_id()))
-                except Exception as e:
-                    logging.error(f"Error embedding video on MacOS: {e}")
-                    messagebox.showerror("Error", f"Failed to embed video on MacOS.\n{str(e)}")
-            else:
-                messagebox.showerror("Error", "Unsupported OS.")
+            set_video_output(self.player, self.video_frame.winfo_id())
         except Exception as e:
             logging.error(f"Error embedding video: {e}")
             messagebox.showerror("Error", f"Failed to embed video.\n{str(e)}")
@@ -559,22 +962,51 @@ class VideoPlayer:
 
     def playphrase(self):
         """
-        Open a new browser window and navigate to the playphrase.me URL.
-        URL has the following format: https://www.playphrase.me/#/search?q= and the selected text from the left subtitle section is appended to the end of the URL.
+        Play every clip of the local library in which the text selected in the left
+        subtitle section is said, back to back. If the library has none, offer to
+        search playphrase.me instead:
+        https://www.playphrase.me/#/search?q= with the selected text appended.
         """
         try:
             # Get the selected text from the left subtitle section
             selected_text = self.left_subtitle_text.get(tk.SEL_FIRST, tk.SEL_LAST).strip()
-            # Open a new browser window and navigate to the playphrase.me URL
-            webbrowser.open(f"https://www.playphrase.me/#/search?q={selected_text}")
         except Exception as e:
             logging.error(f"Error playing phrase: {e}")
             messagebox.showerror("Error", f"Failed to play phrase.\n{str(e)}")
+            return
+        # The library search runs off the Tk thread; on_playphrase_ready plays the clips
+        threading.Thread(target=self.find_subtitle_hits, args=('playphrase', selected_text), daemon=True).start()
+
+    def on_playphrase_ready(self, value):
+        selected_text, hits, error = value
+        try:
+            if error:
+                raise error
+            clips = build_playlist(hits)
+            if not clips:
+                if messagebox.askyesno("Playphrase", f"\"{selected_text}\" was not found in the local library.\n"
+                                                     f"Search playphrase.me instead?"):
+                    # Open a new browser window and navigate to the playphrase.me URL
+                    import webbrowser
+                    webbrowser.open(f"https://www.playphrase.me/#/search?q={selected_text}")
+                return
+
+            if self.player.is_playing():
+                self.toggle_play_pause()
+            if self.montage:
+                self.montage.close()
+            self.montage = ClipMontage(self.master, self.instance, clips, title=f"Playphrase: {selected_text}")
+        except Exception as e:
+            logging.error(f"Error playing phrase: {e}")
+            messagebox.showerror("Error", f"Failed to play phrase.\n{str(e)}")
+
     def move_to_same_screen(self):
         """
         Ensure the main window is on the same screen as the controls window before fullscreen.
         """
         try:
+            from screeninfo import get_monitors
+
             # Get the position of the controls window
             controls_x = self.controls_window.winfo_x()
             controls_y = self.controls_window.winfo_y()
@@ -602,13 +1034,17 @@ class VideoPlayer:
         Toggle between play and pause states.
         Can be called by the space bar or the play/pause button.
         """
+        # VLC reports the new state on its own thread; keep the bridge listening for it
+        self.events.wake()
         if self.player.is_playing():
             self.player.pause()
             self.play_pause_btn.config(text="Play")
+            self.clock.pause()
             logging.info("Playback paused.")
         else:
             self.player.play()
             self.play_pause_btn.config(text="Pause")
+            self.clock.resume()
             logging.info("Playback started.")
 
     def play_pause(self):
@@ -630,9 +1066,10 @@ class VideoPlayer:
                 current_time_ms = self.player.get_time()
                 new_time = max(0, current_time_ms + (offset * 1000))  # Convert to milliseconds
                 self.player.set_time(int(new_time))
+                self.on_seek(int(new_time))
                 self.last_user_seek_time = current_time
                 self.slider_update_in_progress = False
-                logging.info(f"Seeked {'forward' if offset > 0 else 'backward'} by {abs(offset)} seconds.")
+                hot_log.info(f"Seeked {'forward' if offset > 0 else 'backward'} by {abs(offset)} seconds.")
         except Exception as e:
             logging.error(f"Error seeking relative: {e}")
             messagebox.showerror("Error", f"Failed to seek relative.\n{str(e)}")
@@ -640,35 +1077,88 @@ class VideoPlayer:
     def seek(self, value):
         """
         Seek to a specific position in the video based on the slider.
+        While the slider is dragged the positions are coalesced: at most one seek
+        every SCRUB_SEEK_INTERVAL_MS, always to the latest position.
         """
         try:
-            # If this is a programmatic update, ignore it
-            if self.slider_update_in_progress:
+            # If this is a programmatic update, ignore it. Tk reports set() through the
+            # command later, once the in-progress flag has already been cleared.
+            if self.slider_update_in_progress or int(float(value)) == self.slider_set_value:
                 return
 
             length = self.player.get_length()
             if length > 0:
                 # Calculate the target seek time in milliseconds
-                seek_time = (float(value) / 1000.0) * length
-                
-                # Update the player position immediately
-                self.player.set_time(int(seek_time))
-                self.last_user_seek_time = time.time()
-                
-                # Force update the time label
-                self.update_time_label()
-                logging.info(f"User seeking to: {seek_time} ms")
-                
-                # If the player was paused, play a single frame to show the new position
-                if not self.player.is_playing():
+                seek_time = int((float(value) / 1000.0) * length)
+                if not self.slider_dragging:
+                    self.seek_slider_to(seek_time)
+                    return
+
+                self.scrub_target_ms = seek_time
+                self.time_label.config(text=f"{self.seconds_to_time(seek_time / 1000)} / {self.seconds_to_time(self.length)}")
+                if self.scrub_handle is None:
+                    wait = SCRUB_SEEK_INTERVAL_MS - (time.monotonic() - self.last_scrub_seek) * 1000
+                    self.scrub_handle = self.master.after(max(0, int(wait)), self.scrub_seek)
+
+        except Exception as e:
+            logging.error(f"Error seeking video: {e}")
+            messagebox.showerror("Error", f"Failed to seek video.\n{str(e)}")
+
+    def start_scrub(self, event=None):
+        self.slider_dragging = True
+        self.slider_set_value = None
+
+    def end_scrub(self, event=None):
+        """
+        Slider released: drop the pending coalesced seek and seek exactly to where the
+        drag stopped. A click that did not move the slider leaves the position alone.
+        """
+        self.slider_dragging = False
+        if self.scrub_handle is not None:
+            self.master.after_cancel(self.scrub_handle)
+            self.scrub_handle = None
+        if self.scrub_target_ms is not None:
+            self.seek_slider_to(self.scrub_target_ms)
+        self.scrub_target_ms = None
+
+    def scrub_seek(self):
+        self.scrub_handle = None
+        if self.slider_dragging and self.scrub_target_ms is not None:
+            self.last_scrub_seek = time.monotonic()
+            self.seek_slider_to(self.scrub_target_ms)
+
+    def seek_slider_to(self, seek_time):
+        """
+        Seek to seek_time (ms) for the slider. When paused, briefly play to show the
+        new frame; only one such pause is pending at a time.
+        """
+        try:
+            # Update the player position immediately
+            self.player.set_time(seek_time)
+            self.on_seek(seek_time)
+            self.last_user_seek_time = time.time()
+
+            # Force update the time label
+            self.update_time_label()
+            hot_log.info(f"User seeking to: {seek_time} ms")
+
+            # If the player was paused, play a single frame to show the new position
+            if self.frame_step_handle is not None or not self.player.is_playing():
+                if self.frame_step_handle is not None:
+                    self.master.after_cancel(self.frame_step_handle)
+                else:
                     self.player.play()
-                    self.player.set_time(int(seek_time))  # Set time again to ensure accuracy
-                    self.master.after(100, self.player.pause)  # Pause after a short delay
-                
+                    self.player.set_time(seek_time)  # Set time again to ensure accuracy
+                self.frame_step_handle = self.master.after(100, self.end_frame_step)
+
         except Exception as e:
             logging.error(f"Error seeking video: {e}")
             messagebox.showerror("Error", f"Failed to seek video.\n{str(e)}")
 
+    def end_frame_step(self):
+        self.frame_step_handle = None
+        self.player.pause()  # Pause after a short delay
+
     def set_volume(self, volume):
         """
         Set the player's volume based on the slider.
@@ -676,7 +1166,7 @@ class VideoPlayer:
         try:
             volume = int(volume)
             self.player.audio_set_volume(volume)
-            logging.info(f"Volume set to: {volume}")
+            hot_log.info(f"Volume set to: {volume}")
         except Exception as e:
             logging.error(f"Error setting volume: {e}")
             messagebox.showerror("Error", f"Failed to set volume.\n{str(e)}")
@@ -684,44 +1174,36 @@ class VideoPlayer:
     def update_slider(self):
         """
         Update the time slider based on the current playback position.
+        Called periodically by the playback clock.
         """
-        if self.is_closed:
+        if self.is_closed or self.slider_dragging:
             return
 
         try:
-            current_time = time.time()
-            if self.player.is_playing() and current_time - self.last_update_time >= 0.5:
-                position_ms = self.player.get_time()
-                length = self.player.get_length()
+            position_ms = self.get_current_time_ms()
+            length = self.length * 1000
+            
+            if length > 0:
+                position = (position_ms / length) * 1000
+                current_pos = float(self.time_slider.get())
                 
-                if length > 0:
-                    position = (position_ms / length) * 1000
-                    current_pos = float(self.time_slider.get())
-                    
-                    # Only update if position has changed significantly (more than 1%)
-                    if abs(current_pos - position) > 10:  # 1% of 1000
-                        self.slider_update_in_progress = True
-                        self.time_slider.set(int(position))
-                        self.last_position = position
-                        self.last_update_time = current_time
-                        self.slider_update_in_progress = False
-                    
-                    self.update_time_label()
+                # Only update if position has changed significantly (more than 1%)
+                if abs(current_pos - position) > 10:  # 1% of 1000
+                    self.slider_update_in_progress = True
+                    self.slider_set_value = int(position)
+                    self.time_slider.set(int(position))
+                    self.last_position = position
+                    self.slider_update_in_progress = False
         except Exception as e:
             logging.error(f"Error updating slider: {e}")
 
-        # Schedule the next update with a longer interval
-        if not self.is_closed:
-            self.master.after(500, self.update_slider)
-        self.update_subtitles()
-
     def update_time_label(self):
         """
         Update the playback time label.
         """
         try:
             if self.length > 0:
-                current_time = self.player.get_time()  # in milliseconds
+                current_time = self.get_current_time_ms()  # in milliseconds
                 length = self.length
                 current_sec = int(current_time / 1000)
                 total_sec = int(length)
@@ -748,146 +1230,224 @@ class VideoPlayer:
         Handle closing of the application. Persist current video state.
         """
         self.is_closed = True  # Set the flag to True when closing
+        self.clock.stop()
+        self.explanation_worker.stop()
+        if self.explanation_prefetcher:
+            self.explanation_prefetcher.stop()
+        if self.explanation_cache:
+            logging.info(f"Explanation cache: {self.explanation_cache.stats()}")
+            self.explanation_cache.close()
+        if self.montage:
+            self.montage.close()
+        # VLC callbacks only queue values, so detaching and stopping cannot wait on Tk
+        self.events.stop()
+        self.events.detach()
         try:
             if self.player:
-                media = self.player.get_media()
-                if not media:
+                video_path = self.get_video_path()
+                if not video_path:
                     logging.warning("No media is currently loaded.")
                 else:
-                    video_path = media.get_mrl()
-                    if video_path.startswith("file://"):
-                        video_path = video_path[7:]  # Remove 'file://' prefix
-                    video_path = os.path.abspath(video_path)
-
-                    # Get current playback time in seconds
-                    current_time = self.player.get_time() / 1000 if self.player.get_time() > 0 else 0
-
-                    # Get subtitle file paths and additional text path
-                    left_sub_path = getattr(self, 'left_subtitle_path', None)
-                    right_sub_path = getattr(self, 'right_subtitle_path', None)
-                    #additional_text_path = getattr(self, 'additional_text_path', None)
-
-                    # Update persistent data
-                    self.persistent_data[video_path] = {
-                        'left_subtitle': left_sub_path,
-                        'right_subtitle': right_sub_path,
-                        #'additional_text': additional_text_path,
-                        'last_playback_time': current_time,
-                        'audio_track': self.current_audio_track,
-                        'subtitle_track': self.current_subtitle_track,
-                        'volume': self.player.audio_get_volume()  # Save current volume
-                    }
-
-                    self.save_persisted_data()
-                    logging.info(f"Persisted state for {video_path} saved at {current_time} seconds.")
+                    self.save_video_state(video_path)
 
                     self.player.stop()
                     logging.info("Video player stopped.")
         except Exception as e:
             logging.error(f"Error during on_close: {e}")
+        # Writes whatever is still queued
+        if self.state_store:
+            self.state_store.stop()
         self.master.destroy()
 
     def load_subtitles(self, section):
         file_path = filedialog.askopenfilename(filetypes=[("SRT Files", "*.srt")])
         if file_path:
             try:
-                subtitles = self.load_subtitle_file(file_path)
-                if section == 'left':
-                    self.left_subtitles = subtitles
-                    self.left_subtitle_index = 0
-                    self.left_subtitle_path = os.path.abspath(file_path)  # Track left subtitle path
-                else:
-                    self.right_subtitles = subtitles
-                    self.right_subtitle_index = 0
-                    self.right_subtitle_path = os.path.abspath(file_path)  # Track right subtitle path
-                logging.info(f"Loaded subtitles for {section} section: {file_path}")
-                self.update_subtitles()
+                self.use_subtitle_file(section, file_path)
             except Exception as e:
                 logging.error(f"Error loading subtitles: {e}")
                 messagebox.showerror("Error", f"Failed to load subtitles.\n{str(e)}")
 
+    def use_subtitle_file(self, section, file_path):
+        """
+        Show an SRT file in the left or right section and remember it for the video.
+        """
+        subtitles = self.load_subtitle_file(file_path)
+        if section == 'left':
+            self.left_subtitles = subtitles
+            self.left_subtitle_index = 0
+            self.left_subtitle_path = os.path.abspath(file_path)  # Track left subtitle path
+        else:
+            self.right_subtitles = subtitles
+            self.right_subtitle_index = 0
+            self.right_subtitle_path = os.path.abspath(file_path)  # Track right subtitle path
+        logging.info(f"Loaded subtitles for {section} section: {file_path}")
+        self.align_subtitle_tracks()
+        video_path = self.get_video_path()
+        if video_path:
+            self.get_state_store().update(video_path, **{f'{section}_subtitle': os.path.abspath(file_path)})
+        self.clock.trigger('subtitles')
+
+    def resync_subtitles(self):
+        """
+        Synchronize the left subtitles to the speech in the current audio track
+        (in the background) and show the corrected copy once it is written.
+        """
+        # ffmpeg needs the file path as opened, not the one derived from VLC's MRL
+        video_path = self.loaded_video_file
+        srt_path = getattr(self, 'left_subtitle_path', None)
+        if not video_path or not self.get_video_path() or not srt_path:
+            messagebox.showinfo("Resync Subtitles", "Load a video and left subtitles first.")
+            return
+        try:
+            import resync  # Needs numpy, which only this feature uses
+        except ImportError as e:
+            logging.error(f"Error loading subtitle resync: {e}")
+            messagebox.showerror("Error", f"Resyncing subtitles needs numpy.\n{str(e)}")
+            return
+        # ffmpeg counts audio streams from 0; VLC's descriptions also list "Disable" (-1)
+        track_ids = [impl for impl, _ in (self.player.audio_get_track_description() or []) if impl != -1]
+        current = self.player.audio_get_track()
+        audio_index = track_ids.index(current) if current in track_ids else 0
+        self.resync_btn.config(state=tk.DISABLED)
+        threading.Thread(target=self.compute_resync, args=(resync, video_path, srt_path, audio_index),
+                         daemon=True).start()
+
+    def compute_resync(self, resync, video_path, srt_path, audio_index):
+        """
+        Background thread: decode the audio and write the resynced SRT.
+        """
+        try:
+            output_file, sync = resync.resync_subtitles(video_path, srt_path, audio_index=audio_index)
+            self.events.post('resync', (video_path, output_file, sync, None))
+        except Exception as e:
+            logging.error(f"Error resyncing {srt_path}: {e}")
+            self.events.post('resync', (video_path, None, None, e))
+
+    def on_resync_ready(self, value):
+        video_path, output_file, sync, error = value
+        self.resync_btn.config(state=tk.NORMAL)
+        if error:
+            messagebox.showerror("Error", f"Failed to resync subtitles.\n{str(error)}")
+            return
+        if video_path != self.loaded_video_file:
+            return  # Another video was opened meanwhile
+        try:
+            self.use_subtitle_file('left', output_file)
+            messagebox.showinfo("Resync Subtitles", f"Shifted by {sync['offset']:+.2f} s, "
+                                                    f"speed x{sync['scale']:.5f}.\nSaved to {output_file}")
+        except Exception as e:
+            logging.error(f"Error loading subtitles: {e}")
+            messagebox.showerror("Error", f"Failed to load subtitles.\n{str(e)}")
+
+    def align_subtitle_tracks(self):
+        """
+        Align the right subtitles to the left ones in the background; until that is
+        done (or if the tracks do not align) both panes follow the playback time.
+        """
+        self.subtitle_alignment = None
+        left_path = getattr(self, 'left_subtitle_path', None)
+        right_path = getattr(self, 'right_subtitle_path', None)
+        if not ALIGN_SUBTITLES or not left_path or not right_path:
+            return
+        threading.Thread(target=self.compute_alignment,
+                         args=(left_path, right_path, self.left_subtitles, self.right_subtitles),
+                         daemon=True).start()
+
+    def compute_alignment(self, left_path, right_path, left, right):
+        """
+        Background thread: align two subtitle tracks (cached per file pair).
+        """
+        try:
+            alignment = align_subtitles_cached(left_path, right_path, left, right)
+        except Exception as e:
+            logging.error(f"Error aligning {left_path} and {right_path}: {e}")
+            alignment = None
+        self.events.post('alignment', (left, right, alignment))
+
+    def on_alignment_ready(self, value):
+        left, right, alignment = value
+        if left is self.left_subtitles and right is self.right_subtitles:
+            self.subtitle_alignment = alignment
+            self.subtitle_valid_until = 0
+            self.clock.trigger('subtitles')
+
     @staticmethod
     def parse_srt(content):
-        pattern = re.compile(r'(\d+)\n(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\n((?:.*\n)*?)(?:\n|$)')
-        subtitles = []
-        for match in pattern.finditer(content):
-            start = VideoPlayer.parse_time(match.group(2))
-            end = VideoPlayer.parse_time(match.group(3))
-            text = match.group(4).strip()
-            subtitles.append({'start': start, 'end': end, 'content': text})
-        return subtitles
+        return parse_srt(content)
 
     @staticmethod
     def parse_time(time_str):
-        h, m, s = time_str.replace(',', '.').split(':')
-        return timedelta(hours=int(h), minutes=int(m), seconds=float(s)).total_seconds()
+        return parse_time(time_str)
 
     def update_subtitles(self):
-        if self.is_closed or not self.player.is_playing():
-            return  # Exit if the window has been closed or video is not playing
+        """
+        Refresh both subtitle panes. Called by the playback clock, which uses the
+        returned delay (ms) to wake up again exactly at the next cue boundary.
+        """
+        if self.is_closed:
+            return None  # Exit if the window has been closed
 
         try:
-            current_time = self.player.get_time() / 1000  # Convert to seconds
-
-            self.update_subtitle_section(current_time, self.left_subtitles, self.left_subtitle_text, 'left')
-            self.update_subtitle_section(current_time, self.right_subtitles, self.right_subtitle_text, 'right')
+            current_time = self.get_current_time_ms() / 1000  # Convert to seconds
+
+            left_index = self.update_subtitle_section(current_time, self.left_subtitles, self.left_subtitle_pane, 'left')
+            if self.explanation_prefetcher and left_index >= 0:
+                self.explanation_prefetcher.look_ahead(self.left_subtitles, left_index)
+
+            alignment = self.subtitle_alignment
+            right_time = alignment.time_map(current_time) if alignment else current_time
+            right_index = alignment.right_index(left_index) if alignment else -1
+            valid_until = self.left_subtitles.next_boundary(current_time, left_index)
+            if right_index >= 0:
+                # The right pane follows the left one through the cue mapping, so only
+                # the left cue's boundaries matter (the mapped right cue may end earlier)
+                self.right_subtitle_pane.render(self.right_subtitles, right_index)
+                self.right_subtitle_index = right_index
+            else:
+                right_index = self.update_subtitle_section(right_time, self.right_subtitles, self.right_subtitle_pane, 'right')
+                valid_until = min(valid_until, self.right_subtitles.next_boundary(right_time, right_index)
+                                  - (right_time - current_time))
+
+            # Nothing changes on screen before the next cue boundary of either pane
+            self.subtitle_valid_from = current_time
+            self.subtitle_valid_until = valid_until
+            if self.subtitle_valid_until == float('inf'):
+                return None  # No more cues; a seek or new subtitles will wake us up
+
+            # A cue stays active up to and including its end time, so wake just after it
+            delay = (self.subtitle_valid_until - current_time) * 1000 / self.playback_rate + 1
+            return max(SUBTITLE_MIN_WAIT_MS, delay)
         except Exception as e:
             logging.error(f"Error updating subtitles: {e}")
+            return None
 
-        # Schedule the next update
-        if not self.is_closed:
-            self.master.after(100, self.update_subtitles)
-
-    def update_subtitle_section(self, current_time, subtitles, text_widget, section):
+    def update_subtitle_section(self, current_time, subtitles, pane, section):
+        """
+        Show the cue active at current_time in a subtitle pane.
+        Returns the active cue index, or -1 if no cue is active.
+        """
         if not subtitles:
-            return
+            return -1
 
         try:
-            current_subtitle = None
-            current_index = 0
-            for i, subtitle in enumerate(subtitles):
-                if subtitle['start'] <= current_time <= subtitle['end']:
-                    current_subtitle = subtitle
-                    current_index = i
-                    break
-
-            if current_subtitle:
-                prev_subtitles = subtitles[max(0, current_index - 3):current_index]
-                next_subtitles = subtitles[current_index + 1:current_index + 3]
-
-                text_widget.config(state=tk.NORMAL)  # Enable editing
-                text_widget.delete(1.0, tk.END)
-
-                # Insert previous subtitles
-                for s in prev_subtitles:
-                    text_widget.insert(tk.END, s['content'] + "\n\n")
-
-                # Insert current subtitle (will be underlined later)
-                current_start = text_widget.index(tk.END)
-                text_widget.insert(tk.END, current_subtitle['content'] + "\n\n")
-                current_end = text_widget.index(tk.END + "-1c")  # End of the current subtitle
-
-                # Insert next subtitles
-                for s in next_subtitles:
-                    text_widget.insert(tk.END, s['content'] + "\n\n")
-
-                # Apply underline to current subtitle
-                text_widget.tag_remove("underline", "1.0", tk.END)  # Remove previous underlines
-                text_widget.tag_add("underline", current_start, current_end)
-                text_widget.tag_configure("underline", underline=True)
-
-                # Ensure the current subtitle is visible
-                text_widget.see(current_start)
+            previous_index = self.left_subtitle_index if section == 'left' else self.right_subtitle_index
+            current_index = subtitles.find(current_time, hint=previous_index)
 
-                text_widget.config(state=tk.DISABLED)  # Disable editing
+            if current_index >= 0:
+                # Only touches the Text widget when the active cue changed
+                pane.render(subtitles, current_index)
 
-            if section == 'left':
-                self.left_subtitle_index = current_index
-            else:
-                self.right_subtitle_index = current_index
+                # Remember the active cue; it is the lookup hint for the next tick
+                if section == 'left':
+                    self.left_subtitle_index = current_index
+                else:
+                    self.right_subtitle_index = current_index
+            return current_index
 
         except Exception as e:
             logging.error(f"Error updating {section} subtitle section: {e}")
+            return -1
 
     # ---- New Methods for Subtitle Stream Selection ----
 
@@ -963,7 +1523,8 @@ class VideoPlayer:
             current_time = self.player.get_time()  # Current time in milliseconds
             new_time = max(0, current_time - (seconds * 1000))  # Ensure we don't go below 0
             self.player.set_time(int(new_time))
-            logging.info(f"Rewound video by {seconds} seconds")
+            self.on_seek(int(new_time))
+            hot_log.info(f"Rewound video by {seconds} seconds")
         except Exception as e:
             logging.error(f"Error rewinding video: {e}")
             messagebox.showerror("Error", f"Failed to rewind video.\n{str(e)}")
@@ -978,18 +1539,16 @@ class VideoPlayer:
                 return
 
             current_time = self.player.get_time() / 1000  # Convert to seconds
-            next_subtitle = None
 
             # Find the next subtitle that starts after current time
-            for subtitle in self.left_subtitles[self.left_subtitle_index:]:
-                if subtitle['start'] > current_time:
-                    next_subtitle = subtitle
-                    break
+            next_index = self.left_subtitles.next_start_after(current_time)
 
-            if next_subtitle:
+            if next_index >= 0:
                 # Jump to the start time of the next subtitle
-                self.player.set_time(int(next_subtitle['start'] * 1000)-500)
-                logging.info(f"Jumped to next subtitle at {next_subtitle['start']} seconds")
+                next_start = self.left_subtitles.starts[next_index]
+                self.player.set_time(int(next_start * 1000)-500)
+                self.on_seek(int(next_start * 1000)-500)
+                hot_log.info(f"Jumped to next subtitle at {next_start} seconds")
             else:
                 logging.info("No next subtitle found")
 
@@ -1078,43 +1637,60 @@ class VideoPlayer:
 
     def get_explanation_from_ai(self, text, language="English"):
         """
-        Get an explanation for the given text from an AI model.
+        Request an explanation for the given text from an AI model without blocking the UI.
+        The answer is shown by show_ai_explanation; selecting new text before it
+        arrives replaces the pending request.
         
         Args:
             text (str): Text to get an explanation for
-        
-        Returns:
-            str: Explanation generated by the AI model
-        """
-        # Placeholder implementation
-        api_key = os.getenv('OPENAI_API_KEY')
-        print(api_key)
-        client = OpenAI(api_key=api_key)
-        count_words = len(text.split())
-        if count_words<3:
-            prompt = f"Briefly explain the following word in simple terms: \"{text}\""
-        else:
-            prompt = f"Briefly explain the following text in simple terms: \"{text}\""
-
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Act as a helpful expert with ten years of experience that provides the best possible answers to my questions and requests. Your domain of expertise is teaching "+language+"."},
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
+            language (str): Language being taught
 
+        Returns:
+            int: Id of the queued request, or None if the answer was cached
+        """
+        explanation = self.explanation_worker.cached(text, language)
+        if explanation is not None:
+            # Answered already: show it now and make sure no older request overwrites it
+            self.explanation_worker.cancel()
+            self.ai_request_id = None
+            self.set_ai_text(explanation)
+            return None
+        self.set_ai_text(f"Explaining \"{text.strip()}\"...")
+        self.ai_display_length = -1  # Placeholder shown
+        self.ai_request_id = self.explanation_worker.submit(text, language, looked_up=True)
+        return self.ai_request_id
+
+    def show_ai_explanation(self, result):
+        """
+        Display a partial (streaming) or finished explanation. Runs on the Tk thread.
+        Partial results carry all text received so far; only the new tail is appended.
+        """
+        if result['id'] != self.ai_request_id:
+            return  # Superseded by a newer selection
+        if result['error']:
+            self.set_ai_text(f"Failed to get AI explanation.\n{result['error']}")
+            return
+        explanation = result['explanation'] or ""
+        if self.ai_display_length < 0:
+            # First text of this answer replaces the placeholder
+            self.ai_display_length = 0
+            self.set_ai_text("")
+        if len(explanation) > self.ai_display_length:
+            self.ai_text.config(state=tk.NORMAL)
+            self.ai_text.insert(tk.END, explanation[self.ai_display_length:])
+            self.ai_text.config(state=tk.DISABLED)
+            self.ai_display_length = len(explanation)
+
+    def set_ai_text(self, content):
         self.ai_text.config(state=tk.NORMAL)
         self.ai_text.delete(1.0, tk.END)
-        self.ai_text.insert(tk.END, completion.choices[0].message.content)
+        self.ai_text.insert(tk.END, content)
         self.ai_text.config(state=tk.DISABLED)
 
-        return completion.choices[0].message
-
 if __name__ == "__main__":
+    # Configure logging: records are written by a background listener. Only when run
+    # as the player, so importing this module (e.g. from benchmark.py) has no side effects.
+    setup_logging()
     try:
         root = tk.Tk()
         player = VideoPlayer(root)